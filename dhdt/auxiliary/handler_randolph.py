@@ -200,8 +200,8 @@ def download_rgi(aoi=None,
 
 def create_rgi_raster(rgi_shapes, geoTransform, crs, raster_path=None):
     """
-    Creates a raster file in the location given by "raster_path", the content
-    of which are the RGI glaciers in the input vector files
+    Rasterizes the RGI glaciers in the input vector files in memory, and
+    creates a raster file in the location given by "raster_path" if given
 
     Parameters
     ----------
@@ -212,7 +212,13 @@ def create_rgi_raster(rgi_shapes, geoTransform, crs, raster_path=None):
     crs : pyproj.crs.crs.CRS
         coordinate reference system (CRS)
     raster_path : string
-        location where the raster file should be positioned
+        location where the raster file should be positioned, when None no
+        file is written
+
+    Returns
+    -------
+    data : numpy.ndarray, size=(m,n), dtype=integer
+        raster with the identifiers of the RGI glaciers, with 0 as no-data
 
     Notes
     -----
@@ -232,6 +238,8 @@ def create_rgi_raster(rgi_shapes, geoTransform, crs, raster_path=None):
         transform=transform,
         dtype=int,
     )
+    if raster_path is None:
+        return data
 
     raster = xr.DataArray(data=data, dims=('y', 'x'))
     raster.rio.write_nodata(0, inplace=True)
@@ -243,6 +251,7 @@ def create_rgi_raster(rgi_shapes, geoTransform, crs, raster_path=None):
                          tiled=True,
                          compress='LZW',
                          dtype="uint32")
+    return data
 
 
 def create_rgi_tile_s2(aoi,
@@ -29,10 +29,13 @@ def squared_difference(A, B):
     return sq_diff
 
 
+def _cost_from_residual(ɛ):
+    return (1 / (2 * len(ɛ))) * np.sum(np.abs(ɛ))
+
+
 def compute_cost(A, y, params):
-    n_samples = len(y)
     hypothesis = np.squeeze(A @ params)
-    return (1 / (2 * n_samples)) * np.sum(np.abs(hypothesis - y))
+    return _cost_from_residual(hypothesis - y)
 
 
 def gradient_descent(A, y, params, learning_rate=0.01, n_iters=100):
@@ -82,27 +85,22 @@ def secant(A, y, J, params, n_iters=5, print_diagnostics=False):
     """
     history = np.zeros((n_iters))
 
+    # the residuals are carried over between iterations, so each iteration
+    # only evaluates the design matrix for the new estimate
+    x0 = params.copy() - .1
+    x1 = params.copy()
+    fx0 = np.squeeze(A @ x0) - y
+    fx1 = np.squeeze(A @ x1) - y
     if len(params) == 1:  # one dimensional problem
-        x0 = params.copy() - .1
-        x1 = params.copy()
         for i in range(n_iters):
-            fx0 = np.squeeze(A @ x0) - y
-            fx1 = np.squeeze(A @ x1) - y
-
             x2 = x0 - ((x1 - x0) * np.sum(fx0)) / (np.sum(fx1 - fx0))
+            fx2 = np.squeeze(A @ x2) - y
 
             # update
-            x0 = x1.copy()
-            x1 = x2.copy()
-            history[i] = compute_cost(A, y, x1)
+            x0, x1, fx0, fx1 = x1, x2, fx1, fx2
+            history[i] = _cost_from_residual(fx1)
     else:  # multi-variate case
-        x0 = params.copy() - .1
-        x1 = params.copy()
-
         for i in range(n_iters):
-            fx0 = np.squeeze(A @ x0) - y
-            fx1 = np.squeeze(A @ x1) - y
-
             delta_x = x1 - x0
             delta_f = fx1 - fx0
             # estimate Jacobian
@@ -113,12 +111,13 @@ def secant(A, y, J, params, n_iters=5, print_diagnostics=False):
             # estimate new parameter set
             dx = np.linalg.lstsq(J_new, -fx1, rcond=None)[0]
             x2 = x1 + dx
+            fx2 = np.squeeze(A @ x2) - y
 
             if print_diagnostics:
                 print('di:{:+.4f}'.format(x2[0]) + ' dj:{:+.4f}'.format(x2[1]))
             # update
-            x0, x1, J = x1.copy(), x2.copy(), J_new.copy()
-            history[i] = compute_cost(A, y, x1)
+            x0, x1, fx0, fx1, J = x1, x2, fx1, fx2, J_new
+            history[i] = _cost_from_residual(fx1)
         params = x1
 
     if (history[0] < history[-1]) and print_diagnostics:
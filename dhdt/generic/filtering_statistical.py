@@ -381,9 +381,9 @@ def normalized_sampling_histogram(Z):
        american statistical association. vol.21(153) pp.65–66.
     """
     sturge = 1.6 * (np.log2(Z.size) + 1)
-    values, base = np.histogram(Z.flatten(), bins=int(np.ceil(sturge)))
+    values, base = np.histogram(Z.ravel(), bins=int(np.ceil(sturge)))
     # transform to centers
-    base = base[:-1] + np.diff(base)
+    base = base[:-1] + np.diff(base) / 2
     return values, base
 
 
@@ -149,7 +149,12 @@ def shape2raster(shp_fname,
 
     driver = gdal.GetDriverByName('GTiff')
 
-    raster = driver.Create(im_fname, cols, rows, 1, gdal.GDT_UInt16)
+    raster = driver.Create(im_fname,
+                           cols,
+                           rows,
+                           1,
+                           gdal.GDT_UInt16,
+                           options=['TILED=YES', 'COMPRESS=LZW'])
     raster.SetGeoTransform(geoTransform[:6])
     raster.SetProjection(spatialRef)
 
@@ -9,7 +9,7 @@ from netCDF4 import Dataset, date2num
 from osgeo import gdal, ogr, osr
 
 from dhdt.__version__ import __version__
-from dhdt.generic.mapping_tools import pix_centers
+from dhdt.generic.mapping_tools import pix_centers, ref_trans
 from dhdt.generic.unit_check import correct_geoTransform, is_crs_an_srs
 from dhdt.generic.unit_conversion import deg2compass
 from dhdt.testing.mapping_tools import create_local_crs
@@ -63,7 +63,7 @@ def read_geo_info(fname):
     return spatialRef, geoTransform, targetprj, rows, cols, bands
 
 
-def read_geo_image(fname, boi=np.array([]), no_dat=None):
+def read_geo_image(fname, boi=np.array([]), no_dat=None, window=None):
     """ This function takes as input the geotiff name and the path of the
     folder that the images are stored, reads the image and returns the data as
     an array
@@ -77,6 +77,9 @@ def read_geo_image(fname, boi=np.array([]), no_dat=None):
         be specified
     no_dat : {integer,float}
          no data value
+    window : tuple, size=(4,), default=None
+        pixel bounds (i_min, i_max, j_min, j_max) of a subset to read, so only
+        this part of the image is loaded in memory
 
     Returns
     -------
@@ -105,36 +108,55 @@ def read_geo_image(fname, boi=np.array([]), no_dat=None):
 
     >>> I_ones = np.zeros(I.shape, dtype=bool)
     >>> make_geo_im(I_ones, geoTransformM, spatialRefM, "ones.tif")
+
+    only read a subset of the image
+    >>> I_sub, _, geoTransform_sub, _ = read_geo_image(fpath,
+    ...                                                window=(0, 100, 0, 200))
     """
     assert os.path.isfile(fname), ('file does not seem to be present')
 
     img = gdal.Open(fname)
     assert img is not None, ('could not open dataset ' + fname)
 
+    if window is None:
+        i_min, j_min = 0, 0
+        read_args = ()
+    else:
+        assert len(window) == 4, ('please provide (i_min,i_max,j_min,j_max)')
+        i_min, i_max, j_min, j_max = (int(w) for w in window)
+        assert 0 <= i_min < i_max <= img.RasterYSize and \
+            0 <= j_min < j_max <= img.RasterXSize, \
+            ('window is out of the image extent')
+        read_args = (j_min, i_min, j_max - j_min, i_max - i_min)
+
     # imagery can consist of multiple bands
+    # the array from GDAL is used as is, and the bands are stacked only once
+    bands = []
     if len(boi) == 0:
         for counter in range(img.RasterCount):
-            band = np.array(img.GetRasterBand(counter + 1).ReadAsArray())
+            raster = img.GetRasterBand(counter + 1)
+            band = raster.ReadAsArray(*read_args)
             if no_dat is None:
-                no_dat = img.GetRasterBand(counter + 1).GetNoDataValue()
+                no_dat = raster.GetNoDataValue()
             # create masked array
             if no_dat is not None:
                 band = np.ma.array(band, mask=band == no_dat)
-            data = band if counter == 0 else np.dstack(
-                (data, np.atleast_3d(band)))
+            bands.append(band)
     else:
         num_bands = img.RasterCount
         assert (np.max(boi) +
                 1) <= num_bands, 'bands of interest is out of range'
-        for band_id, counter in enumerate(boi):
-            band = np.array(img.GetRasterBand(band_id + 1).ReadAsArray())
-            no_dat = img.GetRasterBand(counter + 1).GetNoDataValue()
-            np.putmask(band, band == no_dat, np.nan)
-            data = band if counter == 0 else np.dstack(
-                (data, np.atleast_3d(band)))
+        for counter in boi:
+            raster = img.GetRasterBand(int(counter) + 1)
+            band = raster.ReadAsArray(*read_args)
+            no_dat = raster.GetNoDataValue()
+            if no_dat is not None:
+                np.putmask(band, band == no_dat, np.nan)
+            bands.append(band)
+    data = bands[0] if len(bands) == 1 else np.dstack(bands)
     spatialRef = img.GetProjection()
-    geoTransform = tuple(float(x)
-                         for x in img.GetGeoTransform()) + data.shape[:2]
+    geoTransform = ref_trans(tuple(float(x) for x in img.GetGeoTransform()),
+                             i_min, j_min) + data.shape[:2]
     targetprj = osr.SpatialReference(wkt=img.GetProjection())
     return data, spatialRef, geoTransform, targetprj
 
@@ -229,7 +251,10 @@ def make_geo_im(Z,
         ysize=Z.shape[0],
         bands=bands,
         eType=gdal_dtype,
-        options=['TFW=YES', 'COMPRESS=LZW', "PREDICTOR=" + predictor])
+        options=[
+            'TFW=YES', 'TILED=YES', 'BLOCKXSIZE=256', 'BLOCKYSIZE=256',
+            'COMPRESS=LZW', "PREDICTOR=" + predictor, 'BIGTIFF=IF_SAFER'
+        ])
 
     # set metadata in datasource
     ds.SetMetadata({
@@ -441,13 +466,15 @@ def make_im_from_geojson(geoTransform,
                                geoTransform[6],
                                geoTransform[7],
                                bands=1,
-                               eType=gdal.GDT_UInt16)
+                               eType=gdal.GDT_UInt16,
+                               options=['TILED=YES', 'COMPRESS=LZW'])
     else:
         target = driver.Create(out_path,
                                geoTransform[6],
                                geoTransform[7],
                                bands=1,
-                               eType=gdal.GDT_Byte)
+                               eType=gdal.GDT_Byte,
+                               options=['TILED=YES', 'COMPRESS=LZW'])
 
     target.SetGeoTransform(geoTransform[:6])
     target.SetProjection(crs)
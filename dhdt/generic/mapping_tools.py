@@ -578,16 +578,21 @@ def cast_orientation(Z, Az, indexing='ij'):
     assert isinstance(Z, np.ndarray), 'please provide an array'
 
     fx, fy = get_grad_filters(ftype='sobel', tsize=3, order=1)
+    cos_az, sin_az = np.cos(np.radians(Az)), np.sin(np.radians(Az))
+    if indexing == 'ij':
+        sin_az = np.negative(sin_az)
 
-    Zdx = ndimage.convolve(Z, fx)  # steerable filters
-    Zdy = ndimage.convolve(Z, fy)
+    dtype = np.result_type(Z.dtype, np.float32)
 
-    if indexing == 'ij':
-        Zcan = (np.multiply(np.cos(np.radians(Az)), Zdy) -
-                np.multiply(np.sin(np.radians(Az)), Zdx))
-    else:
-        Zcan = (np.multiply(np.cos(np.radians(Az)), Zdy) +
-                np.multiply(np.sin(np.radians(Az)), Zdx))
+    if np.ndim(Az) == 0:
+        # steer the filter itself, so a single convolution is needed
+        return ndimage.convolve(Z, cos_az * fy + sin_az * fx, output=dtype)
+
+    Zdx = ndimage.convolve(Z, fx, output=dtype)  # steerable filters
+    Zdy = ndimage.convolve(Z, fy, output=dtype)
+
+    Zcan = np.multiply(cos_az, Zdy, out=Zdy)
+    Zcan += np.multiply(sin_az, Zdx, out=Zdx)
     return Zcan
 
 
@@ -9,7 +9,7 @@ import pandas as pd
 from osgeo import osr
 from PIL import Image, ImageDraw
 from scipy.interpolate import RegularGridInterpolator
-from scipy.ndimage import label
+from scipy.ndimage import find_objects, label
 from scipy.signal import convolve2d
 from skimage.transform import resize
 from sklearn.neighbors import NearestNeighbors
@@ -1700,16 +1700,16 @@ def get_flight_bearing_from_detector_mask_s2(Det):
                      boundary='fill',
                      mode='same')
     D_x[0, :], D_x[-1, :], D_x[:, 0], D_x[:, -1] = 0, 0, 0, 0
-    D_tr = np.abs(D_x) >= 4
+    D_tr = np.abs(D_x, out=D_x) >= 4
 
     L, Lab_num = label(D_tr, structure=[[1, 1, 1], [1, 1, 1], [1, 1, 1]])
 
+    # the extent of each transition follows from its bounding box
     ψ = np.zeros(Lab_num)
-    for i in range(Lab_num):
-        [i_x, j_x] = np.where(L == i + 1)
+    for i, (sl_i, sl_j) in enumerate(find_objects(L)):
         ψ[i] = np.rad2deg(
-            np.arctan2(np.min(j_x) - np.max(j_x),
-                       np.min(i_x) - np.max(i_x)))
+            np.arctan2(sl_j.start - (sl_j.stop - 1),
+                       sl_i.start - (sl_i.stop - 1)))
     ψ = np.rad2deg(
         np.arctan2(np.median(np.sin(np.deg2rad(ψ))),
                    np.median(np.cos(np.deg2rad(ψ)))))
@@ -157,29 +157,43 @@ def get_normalized_hypsometry(RGI, Z, dZ, bins=20):
               sciences, vol.14 pp.815-829, 2010
     """
 
-    def func(x):
-        return np.quantile(x, 0.5)
-
-    hypsometry = None
-    for rgiid in np.unique(RGI):
-        z_r, dz_r = Z[RGI == rgiid], dZ[RGI == rgiid]
-        z_n = np.floor(np.divide(z_r - np.min(z_r), np.ptp(z_r)) * (bins - 1))
-        labels, indices, counts = np.unique(z_n,
-                                            return_counts=True,
-                                            return_inverse=True)
-        arr_split = np.split(dz_r[indices.argsort()], counts.cumsum()[:-1])
-
-        result = np.array(list(map(func, arr_split)))
-        container, info = np.zeros(bins), np.zeros(bins)
-        container[labels.astype(int)] = result
-        info[labels.astype(int)] = 1
-        if hypsometry is None:
-            hypsometry, count = container.copy(), info.copy()
-        else:
-            hypsometry += container
-            count += info
+    Z, dZ = np.asarray(Z).ravel(), np.asarray(dZ).ravel()
+    _, glac = np.unique(np.asarray(RGI).ravel(), return_inverse=True)
+    glac = glac.ravel()
+
+    # normalize the elevation within each glacier
+    idx = np.arange(1, glac.max() + 2)
+    z_min = ndimage.minimum(Z, labels=glac + 1, index=idx)[glac]
+    z_ptp = ndimage.maximum(Z, labels=glac + 1, index=idx)[glac] - z_min
+    z_n = np.divide(Z - z_min,
+                    z_ptp,
+                    out=np.full_like(z_ptp, np.nan, dtype=float),
+                    where=z_ptp > 0)
+
+    # flat or single pixel glaciers, and glaciers with no-data in their
+    # elevation, do not have a normalized elevation, hence are left out
+    IN = np.isfinite(z_n)
+    glac, dZ = glac[IN], dZ[IN]
+    z_n = np.floor(z_n[IN] * (bins - 1)).astype(int)
+
+    # the median of all glacier and elevation bin pairs, through a single
+    # sort, instead of a selection for each glacier
+    key = glac * bins + z_n
+    order = np.lexsort((dZ, key))
+    key_s, dz_s = key[order], dZ[order]
+    labels, start, counts = np.unique(key_s,
+                                      return_index=True,
+                                      return_counts=True)
+    result = (dz_s[start + (counts - 1) // 2] + dz_s[start + counts // 2]) / 2
+    # np.quantile propagates no-data values
+    has_nan = np.add.reduceat(np.isnan(dz_s), start) > 0
+    result[has_nan] = np.nan
+
+    z_bin = labels % bins
+    hypsometry = np.bincount(z_bin, weights=result, minlength=bins)
+    count = np.bincount(z_bin, minlength=bins).astype(float)
     # take the mean
-    hypsometry /= count
+    hypsometry = np.divide(hypsometry, count)
     return hypsometry, count
 
 
@@ -212,12 +226,15 @@ def get_general_hypsometry(Z, dZ, interval=100.):
     assert len(set({Z.size, dZ.size})) == 1, \
         'please provide arrays of the same size'
 
-    L = (Z // interval).astype(int)
-
-    def f(x):
-        return np.nanmedian(x) if x.size != 0 else np.nan
+    # masked no-data is given by NaN's, as indexing drops the mask
+    Z = np.ma.filled(np.ma.asarray(Z, dtype=float), np.nan)
+    dZ = np.ma.filled(np.ma.asarray(dZ, dtype=float), np.nan)
+    IN = ~np.logical_or(np.isnan(Z), np.isnan(dZ))
+    L, dZ = (Z[IN] // interval).astype(int), dZ[IN]
 
-    label, hypsometry, counts = get_stats_from_labelled_array(L, dZ, f)
+    # the medians of all intervals in a single call
+    label, counts = np.unique(L, return_counts=True)
+    hypsometry = ndimage.median(dZ, labels=L, index=label)
     label = np.multiply(label.astype(float), interval)
     return label, hypsometry, counts
 
@@ -1029,16 +1029,18 @@ def get_relative_hypsometric_network(dxyt, Z, geoTransform):
 
     i_1, j_1, i_2, j_2 = np.round(i_1), np.round(j_1), np.round(i_2), np.round(
         j_2)
-    i_1, j_1, i_2, j_2 = remove_posts_pairs_outside_image(
+    i_1, j_1, i_2, j_2, _ = remove_posts_pairs_outside_image(
         Z, i_1, j_1, Z, i_2, j_2)
     i_1 = i_1.astype(int)
     j_1 = j_1.astype(int)
     i_2 = i_2.astype(int)
     j_2 = j_2.astype(int)
 
-    ij_stack = np.vstack((np.hstack((i_1[:, np.newaxis], j_1[:, np.newaxis])),
-                          np.hstack((i_2[:, np.newaxis], j_2[:, np.newaxis]))))
-    posts, idx_inv = np.unique(ij_stack, axis=0, return_inverse=True)
+    # unique posts via a single integer label per pixel, instead of a sort
+    # over the rows of a coordinate stack
+    ij_lab = np.concatenate((i_1 * Z.shape[1] + j_1, i_2 * Z.shape[1] + j_2))
+    ij_lab, idx_inv = np.unique(ij_lab, return_inverse=True)
+    posts = np.column_stack(np.divmod(ij_lab, Z.shape[1]))
 
     m, n = i_1.shape[0], posts.shape[0]
     idx_y = np.concatenate(
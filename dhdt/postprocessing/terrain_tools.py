@@ -170,7 +170,7 @@ def d8_flow(Class,
         # update
         Class_new[Bnd] = Class_new.ravel()[downstream_idx]
         if analysis:
-            Class_stack[..., i] = Class_new.copy()
+            Class_stack[..., i] = Class_new
 
     if analysis:
         return Class_stack
@@ -1,10 +1,12 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 from scipy import ndimage
 
 from dhdt.generic.filtering_statistical import make_2D_Gaussian
 from dhdt.generic.handler_im import bilinear_interpolation
 from dhdt.generic.mapping_tools import create_offset_grid, vel2pix
-from dhdt.preprocessing.shadow_geometry import estimate_surface_normals
 from dhdt.processing.matching_tools import pad_radius
 
 
@@ -98,20 +100,50 @@ def get_ortho_offset(Z, dx, dy, obs_az, obs_zn, geoTransform):
           +----- surface        +------
 
     """
+    # single precision is abundant for elevation differences and offsets
+    Z = Z.astype(np.float32)
     I_grd, J_grd = create_offset_grid(Z, dx, dy, geoTransform)
     Z_dij = ndimage.map_coordinates(Z, [I_grd, J_grd], order=1, mode='mirror')
+    del I_grd, J_grd
 
     # estimate elevation change due to miss-registration
     dZ = Z - Z_dij
 
     # estimate orthorectification compensation
-    ortho_ρ = np.tan(np.deg2rad(obs_zn)) * dZ
+    ortho_ρ = np.tan(np.deg2rad(obs_zn)).astype(np.float32) * dZ
 
-    dI = -np.cos(np.deg2rad(obs_az[0, 0])) * ortho_ρ
-    dJ = +np.sin(np.deg2rad(obs_az)) * ortho_ρ
+    dI = -np.cos(np.deg2rad(obs_az[0, 0])).astype(np.float32) * ortho_ρ
+    dJ = +np.sin(np.deg2rad(obs_az)).astype(np.float32) * ortho_ρ
     return dI, dJ
 
 
+def _warp_tiled(Img, dI, dJ, tile=1024):
+    """ resample an array with offset fields, this is done in strips of rows,
+    so the coordinates are never given for the whole array at once, and the
+    strips are resampled in parallel
+    """
+    m, n = dI.shape
+    Img_warp = np.empty((m, n), dtype=np.result_type(Img.dtype, np.float32))
+    J_grd = np.arange(n)
+
+    def _warp_strip(i):
+        I_grd = np.arange(i, min(i + tile, m))[:, np.newaxis]
+        Img_warp[i:i + tile] = ndimage.map_coordinates(
+            Img, [I_grd + dI[i:i + tile], J_grd + dJ[i:i + tile]],
+            order=1,
+            mode='mirror')
+
+    strips = range(0, m, tile)
+    if (os.cpu_count() or 1) > 1 and m > tile:
+        with ThreadPoolExecutor() as executor:
+            for job in [executor.submit(_warp_strip, i) for i in strips]:
+                job.result()
+    else:
+        for i in strips:
+            _warp_strip(i)
+    return Img_warp
+
+
 def compensate_ortho_offset(Img, Z, dx, dy, obs_az, obs_zn, geoTransform):
     """
 
@@ -143,25 +175,28 @@ def compensate_ortho_offset(Img, Z, dx, dy, obs_az, obs_zn, geoTransform):
     dI_ortho, dJ_ortho = get_ortho_offset(Z, dx, dy, obs_az, obs_zn,
                                           geoTransform)
 
-    mI, nI = Z.shape[0], Z.shape[1]
-    I_grd, J_grd = np.meshgrid(np.linspace(0, mI - 1, mI),
-                               np.linspace(0, nI - 1, nI),
-                               indexing='ij')
-
-    Img_warp = ndimage.map_coordinates(Img,
-                                       [I_grd + dI_ortho, J_grd + dJ_ortho],
-                                       order=1,
-                                       mode='mirror')
+    Img_warp = _warp_tiled(Img, dI_ortho, dJ_ortho)
     del Img  # sometimes the files are very big, so memory is emptied
-    # remove registration mismatch
+    # remove registration mismatch, which is a constant shift
     dI_coreg, dJ_coreg = vel2pix(geoTransform, dx, dy)
-    Img_cor = ndimage.map_coordinates(Img_warp,
-                                      [I_grd + dI_coreg, J_grd + dJ_coreg],
-                                      order=1,
-                                      mode='mirror')
+    Img_cor = ndimage.shift(Img_warp, (-dI_coreg, -dJ_coreg),
+                            order=1,
+                            mode='mirror')
     return Img_cor
 
 
+def _gradient_at(Z, i, j, spac, axis=0):
+    """ finite difference of Z at the given locations, as np.gradient does,
+    thus central differences, and one-sided at the border
+    """
+    idx = (i, j)
+    lo = tuple(np.maximum(a - 1, 0) if k == axis else a
+               for k, a in enumerate(idx))
+    hi = tuple(np.minimum(a + 1, Z.shape[axis] - 1) if k == axis else a
+               for k, a in enumerate(idx))
+    return (Z[hi] - Z[lo]) / ((hi[axis] - lo[axis]) * spac)
+
+
 def get_template_aspect_slope(Z, i_samp, j_samp, t_size, spac=10.):
     """
 
@@ -206,26 +241,31 @@ def get_template_aspect_slope(Z, i_samp, j_samp, t_size, spac=10.):
     # take care of border cases
     t_rad = t_size // 2
     Z = pad_radius(Z, t_rad)
-    i_samp += t_rad
-    j_samp += t_rad
+    i_samp, j_samp = i_samp + t_rad, j_samp + t_rad
 
-    if (t_size % 2) == 0:
-        offset = 0  # even template dimension
-    else:
-        offset = 1  # uneven template dimension
-
-    # create template
+    # create template, the Gaussian is separable, hence it is applied through
+    # two one-dimensional passes
     kernel = make_2D_Gaussian((t_size, t_size), fwhm=t_size)
-    kernel /= np.sum(kernel)
-
-    Z_sm = ndimage.convolve(Z, kernel, mode='reflect')
-
-    # get aspect and slope from elevation
-    Normal = estimate_surface_normals(Z_sm, spac)
-    Normal_samp = Normal[i_samp, j_samp, :]
-
-    Slope = np.rad2deg(np.arccos(Normal_samp[..., -1]))
-    Aspect = np.rad2deg(np.arctan2(Normal_samp[..., 0], Normal_samp[..., 1]))
+    kernel = kernel[0] / np.sum(kernel[0])
+
+    Z_sm = ndimage.convolve1d(Z, kernel, axis=0, mode='reflect')
+    # the second pass is only needed for the rows of the template centers and
+    # their direct neighbours
+    rows = np.zeros(Z.shape[0], dtype=bool)
+    rows[i_samp] = True
+    rows[:-1] |= rows[1:]
+    rows[1:] |= rows[:-1]
+    if not np.all(rows):
+        Z_sm = Z_sm[rows]
+        i_samp = (np.cumsum(rows) - 1)[i_samp]
+    Z_sm = ndimage.convolve1d(Z_sm, kernel, axis=1, mode='reflect')
+
+    # get aspect and slope from elevation, only at the template centers
+    dy = _gradient_at(Z_sm, i_samp, j_samp, spac, axis=0)
+    dx = _gradient_at(Z_sm, i_samp, j_samp, spac, axis=1)
+
+    Slope = np.rad2deg(np.arctan(np.hypot(dx, dy)))
+    Aspect = np.rad2deg(np.arctan2(-dx, dy))
     return Slope, Aspect
 
 
@@ -289,20 +289,24 @@ def histogram_equalization(img, img_ref):
     assert img_ref.ndim == 2, ('please provide a 2D array')
 
     mn = img.shape[:2]
-    img, img_ref = img.flatten(), img_ref.flatten()
-
+    # masked arrays are filled with NaN's, while plain arrays are not copied
     if type(img) in (np.ma.core.MaskedArray, ):
-        np.putmask(img, np.ma.getmaskarray(img), np.nan)
+        img = img.astype(float).filled(np.nan)
     if type(img_ref) in (np.ma.core.MaskedArray, ):
-        np.putmask(img_ref, np.ma.getmaskarray(img_ref), np.nan)
+        img_ref = img_ref.astype(float).filled(np.nan)
+    img, img_ref = img.ravel(), img_ref.ravel()
 
     # make resistant to NaN's
     IN, IN_ref = ~np.isnan(img), ~np.isnan(img_ref)
     # do not do processing if there is a lack of data
     if (np.sum(IN) < 4) or (np.sum(IN_ref) < 4):
-        return img.reshape(mn)
+        return img.reshape(mn).copy()
 
-    new_img = np.zeros_like(img)
+    # no-data stays in place, hence only the data is written
+    if img.dtype.kind == 'f':
+        new_img = np.full_like(img, np.nan)
+    else:
+        new_img = np.zeros_like(img)
     val_img, val_idx, cnt_img = np.unique(img[IN],
                                           return_counts=True,
                                           return_inverse=True)
@@ -317,7 +321,6 @@ def histogram_equalization(img, img_ref):
     intp_img = np.interp(qnt_img, qnt_ref, val_ref)
 
     new_img[IN] = intp_img[val_idx]
-    new_img[~IN] = np.nan
     return new_img.reshape(mn)
 
 
@@ -1,6 +1,5 @@
 import random
 
-import matplotlib.pyplot as plt
 import numpy as np
 from scipy.stats import siegelslopes
 from sklearn.decomposition import fastica
@@ -66,6 +65,7 @@ def bispectral_minimum(B1, B2, tiks=256, qntl=0.1, im_show=False):
     x_ij = get_intersection(ij_0[0, :], ij_0[1, :], ij_1[0, :], ij_1[1, :])
 
     if im_show:
+        import matplotlib.pyplot as plt
         fig = plt.figure()
         ax = fig.add_subplot()
         ax.imshow(H, cmap=plt.cm.gray)
@@ -1,11 +1,16 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache, partial
+
 import numpy as np
-from numpy.lib.stride_tricks import as_strided
-from scipy import ndimage, signal
+from scipy import fft, ndimage
 from skimage.filters import threshold_otsu
+from skimage.filters.rank import median
 from sklearn.cluster import MeanShift, estimate_bandwidth
 
 from ..generic.filtering_statistical import make_2D_Gaussian
-from ..generic.handler_im import diff_compass, rotated_sobel
+from ..generic.handler_im import rotated_sobel
 from ..processing.matching_tools_frequency_filters import perdecomp
 
 
@@ -16,13 +21,14 @@ def enhance_shadows(Shw, method, **kwargs):
     ----------
     Shw : np.array, size=(m,n), dtype={float,integer}
         array with intensities of shading and shadowing
-    method : {‘mean’,’kuwahara’,’median’,’otsu’,'anistropic'}
+    method : {'mean','kuwahara','median','anistropic','L0'}
         method name to be implemented,can be one of the following:
 
             * 'mean' : mean shift filter
             * 'kuwahara' : kuwahara filter
             * 'median' : iterative median filter
             * 'anistropic' : anistropic diffusion filter
+            * 'L0' : L0 gradient minimization
 
     Returns
     -------
@@ -32,36 +38,34 @@ def enhance_shadows(Shw, method, **kwargs):
     See Also
     --------
     mean_shift_filter, kuwahara_filter, iterative_median_filter,
-    anistropic_diffusion_scalar
+    anistropic_diffusion_scalar, L0_smoothing
+
+    Notes
+    -----
+    Floating point imagery is processed in single precision, as the filters
+    are limited by noise rather than by numerical precision. Integer imagery
+    is kept as is, so 8-bit data can use a sliding histogram median.
     """
-    if method in ('mean', 'mean-shift'):
-        quantile = 0.1 if kwargs.get('quantile') is None else kwargs.get(
-            'quantile')
-        M = mean_shift_filter(Shw, quantile=quantile)
-    elif method in ('kuwahara'):
-        tsize = 5 if kwargs.get('tsize') is None else kwargs.get('tsize')
-        M = kuwahara_filter(Shw, tsize=tsize)
-    elif method in ('median'):
-        tsize = 5 if kwargs.get('tsize') is None else kwargs.get('tsize')
-        iter = 50 if kwargs.get('loop') is None else kwargs.get('loop')
-        M = iterative_median_filter(Shw, tsize=tsize, loop=iter)
-    elif method in ('anistropic', 'anistropic-diffusion'):
-        iter = 10 if kwargs.get('iter') is None else kwargs.get('iter')
-        K = .15 if kwargs.get('K') is None else kwargs.get('K')
-        s = .25 if kwargs.get('s') is None else kwargs.get('s')
-        n = 4 if kwargs.get('n') is None else kwargs.get('n')
-        M = anistropic_diffusion_scalar(Shw, iter=iter, K=K, s=s, n=n)
-    elif method in ('L0', 'L0smoothing'):
-        lamb = 2E-2 if kwargs.get('lamb') is None else kwargs.get('lamb')
-        kappa = 2. if kwargs.get('kappa') is None else kwargs.get('kappa')
-        M = L0_smoothing(Shw, lamb=lamb, kappa=kappa)
+    # single precision and contiguous memory, for the heavy filters below
+    if np.iscomplexobj(Shw):
+        Shw = np.ascontiguousarray(Shw, dtype=np.complex64)
+    elif np.issubdtype(Shw.dtype, np.floating):
+        Shw = np.ascontiguousarray(Shw, dtype=np.float32)
     else:
-        assert 1 == 2, 'please provide a correct method'
+        Shw = np.ascontiguousarray(Shw)
+
+    assert method in _METHODS, 'please provide a correct method'
+    func, defaults = _METHODS[method]
+    params = {
+        key: value if kwargs.get(key) is None else kwargs.get(key)
+        for key, value in defaults.items()
+    }
+    M = func(Shw, **params)
     return M
 
 
 # functions to spatially enhance the shadow image
-def mean_shift_filter(Z, quantile=0.1):
+def mean_shift_filter(Z, quantile=0.1, n_samples=20000, random_state=0):
     """ Transform intensity to more clustered intensity, through mean-shift
 
     Parameters
@@ -69,51 +73,50 @@ def mean_shift_filter(Z, quantile=0.1):
     Z : np.array, size=(m,n), dtype=float
         array with intensity values
     quantile : float, range=0...1
+    n_samples : integer, default=20000
+        amount of pixels randomly drawn to fit the mean-shift
+    random_state : {None, int, `numpy.random.Generator`}, default=0
+        seed or generator for drawing the pixels, the default gives the same
+        labels for the same input
 
     Returns
     -------
     labels : np.array, size=(m,n), dtype=integer
         array with numbered labels
+
+    Notes
+    -----
+    The mean-shift is only fitted on a random sample of the pixels, as its
+    neighbor search scales quadratically with the amount of data. Since the
+    intensities are one dimensional, all pixels are then assigned to their
+    nearest cluster center through a sorted lookup.
     """
-    bw = estimate_bandwidth(Z, quantile=quantile, n_samples=Z.shape[1])
+    random_state = np.random.default_rng(random_state)
+    idx = random_state.choice(Z.size,
+                              np.minimum(Z.size, n_samples),
+                              replace=False)
+    sample = Z.ravel()[idx].reshape(-1, 1)
+
+    bw = estimate_bandwidth(sample, quantile=quantile)
     ms = MeanShift(bandwidth=bw, bin_seeding=True)
-    ms.fit(Z.reshape(-1, 1))
+    ms.fit(sample)
 
-    labels = np.reshape(ms.labels_, Z.shape)
+    # nearest center in 1D, through the midpoints of the sorted centers
+    centers = ms.cluster_centers_.ravel()
+    order = np.argsort(centers)
+    edges = (centers[order[:-1]] + centers[order[1:]]) / 2
+    labels = order[np.searchsorted(edges, Z)]
     return labels
 
 
-def kuwahara(buffer):
-    d = int(np.sqrt(len(buffer)))  # assuming square kernel
-    d_sub = int(((d - 1) // 2) + 1)
-
-    buffer = np.reshape(buffer, (d, d))
-    r_a = buffer[:-d_sub + 1, :-d_sub + 1]
-    r_b = buffer[d_sub - 1:, :-d_sub + 1]
-    r_c = buffer[:-d_sub + 1, d_sub - 1:]
-    r_d = buffer[d_sub - 1:, d_sub - 1:]
-
-    var_abcd = np.array([np.var(r_a), np.var(r_b), np.var(r_c), np.var(r_d)])
-    bar_abcd = np.array(
-        [np.mean(r_a), np.mean(r_b),
-         np.mean(r_c), np.mean(r_d)])
-    idx_abcd = np.argmin(var_abcd)
-    return bar_abcd[idx_abcd]
-
-
-def kuwahara_strided(buffer):  # todo: gives error, but it might run faster...?
-    d = int(np.sqrt(len(buffer)))  # assuming square kernel
-    if d == 5:
-        strides = (10, 2, 5, 1)
-        shape = (2, 2, 3, 3)
-    elif d == 3:
-        strides = (3, 1, 3, 1)
-        shape = (2, 2, 2, 2)
-    abcd = as_strided(np.reshape(buffer, (d, d)), shape=shape, strides=strides)
-    var_abcd = np.var(abcd, (2, 3))
-    bar_abcd = np.mean(abcd, (2, 3))
-    idx_abcd = np.argmin(var_abcd)
-    return bar_abcd[idx_abcd]
+def _box_mean(Z, k):
+    """ mean of all blocks of k x k pixels, given at their upper left corner,
+    through running sums along each axis, so round-off does not build up over
+    the whole image, as it would for a summed-area table
+    """
+    Z_bar = ndimage.uniform_filter(Z, size=k, mode='constant')
+    return Z_bar[k // 2:Z.shape[0] - (k - 1) + k // 2,
+                 k // 2:Z.shape[1] - (k - 1) + k // 2]
 
 
 def kuwahara_filter(Z, tsize=5):
@@ -154,16 +157,31 @@ def kuwahara_filter(Z, tsize=5):
     assert np.remainder(tsize - 1, 2) == 0, ('kernel dimension should be odd')
     assert tsize >= 3, ('kernel should be big enough')
 
-    # if (tsize==3) or (tsize==5): # todo
-    #    Z_new = ndimage.generic_filter(
-    #        I, kuwahara_strided, size=(tsize,tsize)
-    #    )
-    # else:
-    Z_new = ndimage.generic_filter(Z, kuwahara, size=(tsize, tsize))
-    return Z_new
+    r = tsize // 2
+    d_sub = r + 1  # dimension of the sub-blocks
+    m, n = Z.shape[:2]
+
+    # local means of all sub-blocks, the intensities are centered, so the
+    # variance does not suffer from cancellation at large intensity values
+    Z_pad = np.pad(Z.astype(np.float64), r, mode='symmetric')
+    Z_mean = np.mean(Z_pad)
+    Z_pad -= Z_mean
+    box_1, box_2 = _box_mean(Z_pad, d_sub), _box_mean(Z_pad**2, d_sub)
+
+    # the four overlapping blocks, that is, A, B, C and D
+    blocks = ((slice(0, m), slice(0, n)), (slice(r, r + m), slice(0, n)),
+              (slice(0, m), slice(r, r + n)),
+              (slice(r, r + m), slice(r, r + n)))
+    bar_abcd = np.stack([box_1[blk] for blk in blocks])
+    var_abcd = np.stack([box_2[blk] for blk in blocks]) - bar_abcd**2
+
+    idx_abcd = np.argmin(var_abcd, axis=0)
+    Z_new = np.take_along_axis(bar_abcd, idx_abcd[np.newaxis], axis=0)[0]
+    Z_new += Z_mean
+    return Z_new.astype(Z.dtype, copy=False)
 
 
-def iterative_median_filter(Z, tsize=5, loop=50):
+def iterative_median_filter(Z, tsize=5, loop=50, backend=None):
     """ Transform intensity to more clustered intensity, through iterative
     filtering with a median operation
 
@@ -175,6 +193,11 @@ def iterative_median_filter(Z, tsize=5, loop=50):
         dimension of the kernel
     loop : integer, {x ∈ ℕ | x ≥ 0}
         amount of iterations
+    backend : {None, 'ndimage', 'rank', 'binary'}
+        implementation of the median filter, either the generic filter of
+        scipy, the sliding histogram of scikit-image or a majority vote for
+        boolean arrays. When not given, the sliding histogram is used for
+        8-bit imagery and the majority vote for masks.
 
     Returns
     -------
@@ -184,29 +207,103 @@ def iterative_median_filter(Z, tsize=5, loop=50):
     See Also
     --------
     kuwahara_filter
+
+    Notes
+    -----
+    Repeated median filtering converges towards a root signal, that is, an
+    image that does not change anymore by the filter. Hence, the iteration
+    stops when such a state is reached. For 8-bit imagery a sliding
+    histogram is used to find the median, following [HY79]_. Other imagery
+    can be filtered this way as well, though it is then quantized to 256
+    levels. The median of a binary mask is true when the majority of its
+    neighborhood is, hence it follows from a (separable) box sum.
+
+    References
+    ----------
+    .. [HY79] Huang et al. "A fast two-dimensional median filtering algorithm"
+              IEEE transactions on acoustics, speech, and signal processing,
+              vol.27(1) pp.13-18, 1979.
     """
-    for i in range(loop):
-        Z = ndimage.median_filter(Z, size=tsize)
+    if backend is None and Z.ndim == 2:
+        if Z.dtype == bool:
+            backend = 'binary'
+        elif (Z.dtype == np.uint8) and (tsize > 3):
+            backend = 'rank'
+    backend = 'ndimage' if backend is None else backend
+    assert backend in ('ndimage', 'rank', 'binary'), \
+        ('please provide a known backend')
+    if backend == 'binary':
+        assert Z.dtype == bool, ('please provide a boolean array')
+
+    if backend == 'rank' and Z.dtype != np.uint8:
+        Z_min, Z_max = np.min(Z), np.max(Z)
+        if Z_min == Z_max:
+            return Z
+        scale = 255 / (Z_max - Z_min)
+        Z_q = np.round((Z - Z_min) * scale).astype(np.uint8)
+        Z_q = iterative_median_filter(Z_q, tsize=tsize, loop=loop,
+                                      backend=backend)
+        return Z_q / scale + Z_min
+
+    if backend == 'rank':
+        func = partial(_median_histogram, tsize=tsize)
+    elif backend == 'binary':
+        func = partial(_median_binary, tsize=tsize)
+    else:
+        func = partial(ndimage.median_filter, size=tsize)
+    # the filters release the GIL, hence large imagery is done in tiles
+    tiled = (os.cpu_count() or 1) > 1 and max(Z.shape[:2]) > 512
+
+    # one pool for all iterations, so start-up costs are only paid once
+    with ThreadPoolExecutor() if tiled else nullcontext() as executor:
+        for i in range(loop):
+            Z_new = _filter_tiled(Z, func, tsize // 2, executor) \
+                if tiled else func(Z)
+            if np.array_equal(Z_new, Z, equal_nan=True):
+                break
+            Z = Z_new
     return Z
 
 
-def selective_blur_func(C, t_size):
-    # decompose arrays, these seem to alternate....
-    C_col = C.reshape(t_size[0], t_size[1], 2)
-    if np.any(np.sign(C[::2]) == -1):
-        M, Z = -1 * C_col[:, :, 0].flatten(), C_col[:, :, 1].flatten()
-    else:  # redundant calculation, just ignore and exit
-        return 0
+def _median_histogram(Z, tsize):
+    # padding, so the border is treated as with the 'reflect' mode of ndimage
+    r = tsize // 2
+    Z_pad = np.pad(Z, r, mode='symmetric')
+    Z_new = median(Z_pad, footprint=np.ones((tsize, tsize), dtype=bool))
+    return Z_new[r:-r, r:-r]
 
-    m_central = M[(t_size[0] * t_size[1]) // 2]
-    i_central = Z[(t_size[0] * t_size[1]) // 2]
-    if m_central != 1:
-        return i_central
 
-    W = make_2D_Gaussian(t_size, fwhm=3).flatten()
-    W /= np.sum(W)
-    new_intensity = np.sum(W * Z)
-    return new_intensity
+def _median_binary(Z, tsize):
+    # amount of true values within the kernel, where the median takes the
+    # element of rank tsize**2//2, as is done in ndimage
+    C = Z.astype(np.int32)
+    for axis in (0, 1):
+        C = ndimage.correlate1d(C, np.ones(tsize, dtype=np.int32), axis=axis,
+                                mode='reflect')
+    return C >= tsize**2 - tsize**2 // 2
+
+
+def _filter_tiled(Z, func, r, executor, tile=512):
+    """ apply a local filter on tiles in parallel, each tile has a halo of the
+    kernel radius, so the result is the same as filtering the whole image
+    """
+    m, n = Z.shape[:2]
+    Z_new = np.empty_like(Z)
+
+    def _filter_tile(i, j):
+        i_0, j_0 = max(i - r, 0), max(j - r, 0)
+        i_1, j_1 = min(i + tile + r, m), min(j + tile + r, n)
+        Z_sub = func(Z[i_0:i_1, j_0:j_1])
+        Z_new[i:i + tile, j:j + tile] = \
+            Z_sub[i - i_0:i - i_0 + tile, j - j_0:j - j_0 + tile]
+
+    jobs = [
+        executor.submit(_filter_tile, i, j) for i in range(0, m, tile)
+        for j in range(0, n, tile)
+    ]
+    for job in jobs:
+        job.result()
+    return Z_new
 
 
 def fade_shadow_cast(Shw, az, t_size=9):
@@ -238,20 +335,25 @@ def fade_shadow_cast(Shw, az, t_size=9):
     W_f = ndimage.convolve(Shw.astype(np.float64), kernel_az)
     M_f = np.logical_and(W_f > 0.001, ~(W_f < 0.001))  # cast ridges
 
-    Combo = np.dstack((Shw, -1. * (M_f.astype(np.float64))))
+    # the Gaussian is separable, hence blur along both axes sequentially
+    g = make_2D_Gaussian((t_size, t_size), fwhm=3)[t_size // 2, :]
+    g /= np.sum(g)
+    S_b = ndimage.convolve1d(Shw.astype(np.float64), g, axis=0, mode='mirror')
+    S_b = ndimage.convolve1d(S_b, g, axis=1, mode='mirror')
 
-    S_b = ndimage.generic_filter(Combo,
-                                 selective_blur_func,
-                                 footprint=np.ones((t_size, t_size, 2)),
-                                 mode='mirror',
-                                 cval=np.nan,
-                                 extra_keywords={'t_size': (t_size, t_size)})
-    S_b = S_b[..., 0]
     Shf = np.copy(Shw).astype(np.float64)
     Shf[M_f] = S_b[M_f]
     return Shf
 
 
+def _diffusion_magnitude(Z):
+    if np.iscomplexobj(Z):  # support complex input
+        return np.abs(Z)
+    if Z.ndim == 3:  # support multispectral input
+        return np.sqrt(np.einsum('ijk,ijk->ij', Z, Z))
+    return Z
+
+
 def diffusion_strength_1(Z, K):
     """ first diffusion function, proposed by [PM87]_, when a complex array is
     provided the absolute magnitude is used, following [Ge92]_
@@ -276,17 +378,13 @@ def diffusion_strength_1(Z, K):
     .. [Ge92] Gerig et al. "Nonlinear anisotropic filtering of MRI data" IEEE
               transactions on medical imaging, vol.11(2), pp.221-232, 1992
     """
-    # admin
-    if np.iscomplexobj(Z):  # support complex input
-        Z_abs = np.abs(Z)
-    elif Z.ndim == 3:  # support multispectral input
-        I_sum = np.sum(Z**2, axis=2)
-        Z_abs = np.sqrt(I_sum, out=np.zeros_like(I_sum), where=I_sum != 0)
-    else:
-        Z_abs = Z
+    Z_abs = _diffusion_magnitude(Z)
 
-    # calculation
-    g_1 = np.exp(-1 * np.divide(Z_abs, K)**2)
+    # calculation, done in place to avoid temporary arrays, where the scaling
+    # and the sign are merged into one pass before the exponent
+    g_1 = np.square(Z_abs, dtype=np.result_type(Z_abs, 1.))
+    g_1 *= -1 / K**2
+    np.exp(g_1, out=g_1)
     return g_1
 
 
@@ -314,19 +412,46 @@ def diffusion_strength_2(Z, K):
     .. [Ge92] Gerig et al. "Nonlinear anisotropic filtering of MRI data" IEEE
               transactions on medical imaging, vol.11(2), pp.221-232, 1992.
     """
-    if np.iscomplexobj(Z):
-        Z_abs = np.abs(Z)
-    elif Z.ndim == 3:  # support multispectral input
-        I_sum = np.sum(Z**2, axis=2)
-        Z_abs = np.sqrt(I_sum, out=np.zeros_like(I_sum), where=I_sum != 0)
-    else:
-        Z_abs = Z
-    # calculation
-    denom = (1 + np.divide(Z_abs, K)**2)
-    g_2 = np.divide(1, denom, where=denom != 0)
+    Z_abs = _diffusion_magnitude(Z)
+
+    # calculation, done in place to avoid temporary arrays
+    denom = np.divide(Z_abs, K)
+    np.square(denom, out=denom)
+    denom += 1
+    g_2 = np.reciprocal(denom, out=denom)
     return g_2
 
 
+def _diffusion_flux(dZ, K, out):
+    g = diffusion_strength_1(dZ, K)
+    if dZ.ndim == 3:  # extent the diffusion parameter to all bands
+        g = g[..., np.newaxis]
+    return np.multiply(g, dZ, out=out)
+
+
+def _diffusion_divergence(Z_di, Z_dj, K, F_i, F_j, out):
+    # the flux is an odd function of the difference, hence the flux towards
+    # the upper neighbor is the opposite of the flux towards the lower
+    # neighbor of the pixel above, the same holds for the left and right
+    _diffusion_flux(Z_di, K, F_i)
+    _diffusion_flux(Z_dj, K, F_j)
+    np.subtract(F_i[1:, ...], F_i[:-1, ...], out=out)
+    out += F_j[:, 1:, ...]
+    out -= F_j[:, :-1, ...]
+    return out
+
+
+def _diffusion_divergence_cross(Z_dk, Z_dl, K, F_k, F_l, out):
+    # same as above, though along both diagonals, where "k" is the difference
+    # towards the lower right and "l" towards the lower left neighbor
+    _diffusion_flux(Z_dk, K, F_k)
+    _diffusion_flux(Z_dl, K, F_l)
+    np.subtract(F_k[1:, 1:, ...], F_k[:-1, :-1, ...], out=out)
+    out += F_l[1:, :-1, ...]
+    out -= F_l[:-1, 1:, ...]
+    return out
+
+
 def anistropic_diffusion_scalar(Z, iter=10, K=.15, s=.25, n=4):
     """ non-linear anistropic diffusion filter of a scalar field
 
@@ -357,73 +482,66 @@ def anistropic_diffusion_scalar(Z, iter=10, K=.15, s=.25, n=4):
     """
     # admin
     Z_new = np.copy(Z)
-    multispec = True if Z.ndim == 3 else False
-    if multispec:
-        b = Z.shape[2]
     if n != 4:
         delta_d = np.sqrt(2)
     s = np.minimum(s, 1 / n)  # see Appendix A in [2]
 
+    # allocate the buffers once, these are overwritten at each iteration
+    m, n_c, b = Z_new.shape[0], Z_new.shape[1], Z_new.shape[2:]
+    Z_di = np.empty((m - 1, n_c - 2) + b, dtype=Z_new.dtype)
+    Z_dj = np.empty((m - 2, n_c - 1) + b, dtype=Z_new.dtype)
+    F_i, F_j = np.empty_like(Z_di), np.empty_like(Z_dj)
+    Z_update = np.empty((m - 2, n_c - 2) + b, dtype=Z_new.dtype)
+    if n > 4:
+        Z_dk = np.empty((m - 1, n_c - 1) + b, dtype=Z_new.dtype)
+        Z_dl, F_k, F_l = (np.empty_like(Z_dk) for _ in range(3))
+        Z_cross = np.empty_like(Z_update)
+
     # processing
     for i in range(iter):
-        Z_u = diff_compass(Z_new, direction='n')
-        Z_d = diff_compass(Z_new, direction='s')
-        Z_r = diff_compass(Z_new, direction='e')
-        Z_l = diff_compass(Z_new, direction='w')
-        if not multispec:
-            Z_update = (diffusion_strength_1(Z_u, K) * Z_u +
-                        diffusion_strength_1(Z_d, K) * Z_d +
-                        diffusion_strength_1(Z_r, K) * Z_r +
-                        diffusion_strength_1(Z_l, K) * Z_l)
-        else:
-            Z_update = (np.tile(np.atleast_3d(diffusion_strength_1(Z_u, K)),
-                                (1, 1, b)) * Z_u +
-                        np.tile(np.atleast_3d(diffusion_strength_1(Z_r, K)),
-                                (1, 1, b)) * Z_r +
-                        np.tile(np.atleast_3d(diffusion_strength_1(Z_d, K)),
-                                (1, 1, b)) * Z_d +
-                        np.tile(np.atleast_3d(diffusion_strength_1(Z_l, K)),
-                                (1, 1, b)) * Z_l)
-        del Z_u, Z_d, Z_r, Z_l
+        # differences between neighbors, along both axes
+        np.subtract(Z_new[1:, 1:-1, ...], Z_new[:-1, 1:-1, ...], out=Z_di)
+        np.subtract(Z_new[1:-1, 1:, ...], Z_new[1:-1, :-1, ...], out=Z_dj)
 
+        _diffusion_divergence(Z_di, Z_dj, K, F_i, F_j, Z_update)
         if n > 4:
             # alternate with the cross-domain, following the approach of [2]
-            Z_ur = diff_compass(Z_new, direction='n') / delta_d
-            Z_lr = diff_compass(Z_new, direction='s') / delta_d
-            Z_ll = diff_compass(Z_new, direction='e') / delta_d
-            Z_ul = diff_compass(Z_new, direction='w') / delta_d
-
-            if not multispec:
-                Z_xtra = (diffusion_strength_1(Z_ur, K) * Z_ur +
-                          diffusion_strength_1(Z_lr, K) * Z_lr +
-                          diffusion_strength_1(Z_ll, K) * Z_ll +
-                          diffusion_strength_1(Z_ul, K) * Z_ul)
-            else:  # extent the diffusion parameter to all bands
-                Z_xtra = (np.tile(np.atleast_3d(diffusion_strength_1(Z_ur, K)),
-                                  (1, 1, b)) * Z_ur +
-                          np.tile(np.atleast_3d(diffusion_strength_1(Z_lr, K)),
-                                  (1, 1, b)) * Z_lr +
-                          np.tile(np.atleast_3d(diffusion_strength_1(Z_ll, K)),
-                                  (1, 1, b)) * Z_ll +
-                          np.tile(np.atleast_3d(diffusion_strength_1(Z_ul, K)),
-                                  (1, 1, b)) * Z_ul)
-            Z_update += Z_xtra
-        Z_new[1:-1, 1:-1] += s * Z_update
+            np.subtract(Z_new[1:, 1:, ...], Z_new[:-1, :-1, ...], out=Z_dk)
+            np.subtract(Z_new[1:, :-1, ...], Z_new[:-1, 1:, ...], out=Z_dl)
+            Z_dk /= delta_d
+            Z_dl /= delta_d
+            Z_update += _diffusion_divergence_cross(Z_dk, Z_dl, K, F_k, F_l,
+                                                    Z_cross)
+        Z_update *= s
+        Z_new[1:-1, 1:-1, ...] += Z_update
     return Z_new
 
 
 def psf2otf(psf, dim):
     m, n = psf.shape[0], psf.shape[1]
 
+    # place the psf circularly shifted, so its center is at the origin
     new_psf = np.zeros(dim)
-    new_psf[:m, :n] = psf[:, :]
-
-    new_psf = np.roll(new_psf, -dim[0] // 2, axis=0)
-    new_psf = np.roll(new_psf, -dim[1] // 2, axis=1)
-    otf = np.fft.fft2(new_psf)
+    idx_i = np.mod(np.arange(m) - m // 2, dim[0])
+    idx_j = np.mod(np.arange(n) - n // 2, dim[1])
+    new_psf[np.ix_(idx_i, idx_j)] = psf
+    otf = fft.fft2(new_psf)
     return otf
 
 
+@lru_cache(maxsize=8)
+def _gradient_otf(m, n):
+    """ transfer functions of the forward differences, these are kept for
+    repeated calls on imagery of the same size, as is the case for tiles
+    """
+    dx, dy = np.array([[+1, -1]]), np.array([[+1], [-1]])
+    # the image is real, hence only half of its Hermitian spectrum is used
+    dx_F = psf2otf(dx, (m, n))[:, :n // 2 + 1]
+    dy_F = psf2otf(dy, (m, n))[:, :n // 2 + 1]
+    dx_F.flags.writeable, dy_F.flags.writeable = False, False
+    return dx_F, dy_F
+
+
 def L0_smoothing(Z, lamb=2E-2, kappa=2., beta_max=1E5):
     """
 
@@ -448,24 +566,27 @@ def L0_smoothing(Z, lamb=2E-2, kappa=2., beta_max=1E5):
     m, n = Z.shape[:2]
     b = 1 if Z.ndim == 2 else Z.shape[2]
 
-    dx, dy = np.array([[+1, -1]]), np.array([[+1], [-1]])
-    dx_F, dy_F = psf2otf(dx, (m, n)), psf2otf(dy, (m, n))
+    dx_F, dy_F = _gradient_otf(m, n)
 
-    Z = perdecomp(Z)[0]
-    N_1 = np.fft.fft2(Z)
-    D_2 = np.abs(dx_F)**2 + np.abs(dy_F)**2
+    # keep single precision input as such
+    dtype = np.result_type(Z.dtype, np.float32)
+    Z = perdecomp(Z)[0].astype(dtype, copy=False)
+    N_1 = fft.rfft2(Z, axes=(0, 1), workers=-1)
+    D_2 = (np.abs(dx_F)**2 + np.abs(dy_F)**2).astype(dtype)
 
-    if b > 1:
-        dx, dy = np.tile(np.atleast_3d(dx), (1, 1, b)), \
-                 np.tile(np.atleast_3d(dy), (1, 1, b))
-        D_2 = np.tile(np.atleast_3d(D_2), (1, 1, b))
+    if b > 1:  # broadcast along the bands
+        D_2 = D_2[..., np.newaxis]
 
     beta = 2 * lamb
+    h, v = np.empty_like(Z), np.empty_like(Z)
     while beta < beta_max:
         D_1 = 1 + beta * D_2
 
-        h = np.roll(signal.fftconvolve(Z, dx, mode='same'), -1, axis=1)
-        v = np.roll(signal.fftconvolve(Z, dy, mode='same'), -1, axis=0)
+        # circular forward differences
+        np.subtract(Z[:, 1:, ...], Z[:, :-1, ...], out=h[:, :-1, ...])
+        np.subtract(Z[:, 0, ...], Z[:, -1, ...], out=h[:, -1, ...])
+        np.subtract(Z[1:, ...], Z[:-1, ...], out=v[:-1, ...])
+        np.subtract(Z[0, ...], Z[-1, ...], out=v[-1, ...])
 
         t = (h**2 + v**2) < (lamb / beta)
         np.putmask(h, t, 0)
@@ -486,8 +607,27 @@ def L0_smoothing(Z, lamb=2E-2, kappa=2., beta_max=1E5):
             N_2 += np.concatenate(
                 (np.array(v[-1, ...] - v[0, ...], ndmin=3), -np.diff(v, 1, 0)),
                 axis=0)
-            N_2 = np.tile(np.atleast_3d(np.sum(N_2, axis=2)), (1, 1, b))
-        I_F = np.divide(N_1 + beta * np.fft.fft2(N_2), D_1)
-        Z = np.real(np.fft.ifft2(I_F))
+            N_2 = np.sum(N_2, axis=2, keepdims=True)
+        Z_F = np.divide(N_1 + beta * fft.rfft2(N_2, axes=(0, 1), workers=-1),
+                        D_1)
+        Z = fft.irfft2(Z_F, s=(m, n), axes=(0, 1), workers=-1)
         beta *= kappa
     return Z
+
+
+# methods of enhance_shadows, with their default parameters
+_METHODS = {
+    'mean': (mean_shift_filter, {'quantile': .1}),
+    'kuwahara': (kuwahara_filter, {'tsize': 5}),
+    'median': (iterative_median_filter, {'tsize': 5, 'loop': 50}),
+    'anistropic': (anistropic_diffusion_scalar, {
+        'iter': 10,
+        'K': .15,
+        's': .25,
+        'n': 4
+    }),
+    'L0': (L0_smoothing, {'lamb': 2E-2, 'kappa': 2.}),
+}
+_METHODS['mean-shift'] = _METHODS['mean']
+_METHODS['anistropic-diffusion'] = _METHODS['anistropic']
+_METHODS['L0smoothing'] = _METHODS['L0']
@@ -1,14 +1,15 @@
 import glob
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from rasterio.features import shapes  # for raster to polygon
 from scipy import ndimage  # for image filtering
 from scipy import special  # for trigonometric functions
 from scipy.interpolate import RegularGridInterpolator  # for interpolation
-from shapely.errors import TopologicalError  # for troubleshooting
-from shapely.geometry import LineString, Point, shape
-from skimage import color  # for labeling image
+from shapely.geometry import LineString, shape
+from skimage import draw  # for rasterizing suntraces
 from skimage import segmentation  # for superpixels
 from skimage.morphology import \
     remove_small_objects  # opening, disk, erosion, closing
@@ -201,7 +202,7 @@ def get_shadow_polygon(M, t_siz):
     ----------
     M : numpy.ndarray, size=(m,n)
         grid with intensity values
-    t_size : integer, {x ∈ ℕ | x ≥ 1}
+    t_siz : integer, {x ∈ ℕ | x ≥ 1}
         window size of the kernel
 
     Returns
@@ -211,11 +212,20 @@ def get_shadow_polygon(M, t_siz):
     super_pix : numpy.ndarray, size=(m,n)
         grid with numbered superpixels
     """
-    mn = np.ceil(np.divide(np.nanprod(M.shape), t_size))
-    super_pix = segmentation.slic(M, sigma=1, n_segments=mn,
-                                  compactness=0.010)  # create super pixels
-
-    mean_im = color.label2rgb(super_pix, M, kind='avg')
+    mn = np.ceil(np.divide(np.nanprod(M.shape), t_siz))
+    # single precision is sufficient for the clustering, while an 8-bit
+    # quantization would change the scale the compactness is relative to
+    super_pix = segmentation.slic(M.astype(np.float32), sigma=1,
+                                  n_segments=mn,
+                                  compactness=0.010,
+                                  channel_axis=None)  # create super pixels
+
+    # mean intensity of each superpixel, through a single weighted count
+    sum_pix = np.bincount(super_pix.ravel(), weights=M.ravel())
+    num_pix = np.bincount(super_pix.ravel())
+    mean_pix = np.divide(sum_pix, num_pix, out=np.zeros_like(sum_pix),
+                         where=num_pix != 0)
+    mean_im = mean_pix.astype(np.float32)[super_pix]
     labels = sturge(mean_im)[0]
     return labels, super_pix
 
@@ -270,32 +280,22 @@ def find_valley(values, base, neighbors=2):
     --------
     normalized_sampling_histogram
     """
-    for i in range(neighbors):
-        if i == 0:
-            wall_plu = np.roll(values, +(i + 1))
-            wall_min = np.roll(values, -(i + 1))
-        else:
-            wall_plu = np.vstack((wall_plu, np.roll(values, +(i + 1))))
-            wall_min = np.vstack((wall_min, np.roll(values, -(i + 1))))
-    wall_plu = np.vstack((values, wall_plu))
-    wall_min = np.vstack((values, wall_min))
+    m = values.size
+    if m < 2 * neighbors + 1:  # too short to hold a valley
+        return base[:0], np.zeros(0)
 
-    concav_plu = np.sign(np.diff(wall_plu, n=1, axis=0)) == +1
-    concav_min = np.sign(np.diff(wall_min, n=1, axis=0)) == +1
-    if neighbors > 1:
-        concav_plu = np.all(concav_plu, axis=0)
-        concav_min = np.all(concav_min, axis=0)
+    # a valley has "n" decreasing steps before, and "n" increasing after it
+    d_values = np.diff(values)
+    fall = sliding_window_view(d_values < 0, neighbors).all(axis=1)
+    rise = sliding_window_view(d_values > 0, neighbors).all(axis=1)
 
     # select the dips
-    selec = np.all(np.vstack((concav_plu, concav_min)), axis=0)
-    selec = selec[neighbors - 1:-(neighbors + 1)]
-    idx = base[neighbors - 1:-(neighbors + 1)]
-    dips = idx[selec]
+    selec = np.logical_and(fall[:m - 2 * neighbors], rise[neighbors:])
+    dips = base[neighbors:m - neighbors][selec]
 
     # estimate quantiles of the valleys
     cumsum_norm = np.cumsum(values) / np.sum(values)
-    cumsum_norm = cumsum_norm[neighbors - 1:-(neighbors + 1)]
-    quantiles = cumsum_norm[selec]
+    quantiles = cumsum_norm[neighbors:m - neighbors][selec]
     return dips, quantiles
 
 
@@ -504,6 +504,20 @@ def shadow_image_to_list(M,
     return
 
 
+def _binary_erosion(M, connectivity=1):
+    """ binary erosion with a 3x3 structuring element, as done by
+    ndimage.binary_erosion, though through shifted views of the mask
+    """
+    M_new = np.zeros_like(M, dtype=bool)
+    if connectivity == 1:  # cross
+        M_new[1:-1, 1:-1] = M[1:-1, 1:-1] & M[:-2, 1:-1] & M[2:, 1:-1] & \
+            M[1:-1, :-2] & M[1:-1, 2:]
+    else:  # square, which is separable
+        M_j = M[:, :-2] & M[:, 1:-1] & M[:, 2:]
+        M_new[1:-1, 1:-1] = M_j[:-2, :] & M_j[1:-1, :] & M_j[2:, :]
+    return M_new
+
+
 def label_occluder_and_casted(labeling, sunAz):
     """ Find along the edge, the casting and casted pixels of a polygon
 
@@ -525,105 +539,85 @@ def label_occluder_and_casted(labeling, sunAz):
     mL, nL = labeling.shape
     shadowIdx = np.zeros((mL, nL), dtype=np.int16)
 
-    inner = ndimage.morphology.binary_erosion(msk)
+    inner = _binary_erosion(msk)
 
-    bndOrient = cast_orientation(inner.astype(np.float), sunAz)
+    bndOrient = cast_orientation(inner.astype(float), sunAz)
     del mL, nL, inner
 
-    labList = np.unique(labeling)
-    labList = labList[labList != 0]
-    for i in labList:
-        selec = labeling == i
-        labIdx = np.nonzero(selec)
-        labImin = np.min(labIdx[0])
-        labImax = np.max(labIdx[0])
-        labJmin = np.min(labIdx[1])
-        labJmax = np.max(labIdx[1])
-        subMsk = selec[labImin:labImax, labJmin:labJmax]
-
-        subOrient = np.sign(bndOrient[labImin:labImax, labJmin:labJmax])
-
-        subBound = subMsk ^ ndimage.morphology.binary_erosion(subMsk)
-        subOrient[~subBound] = 0  # remove other boundaries
-
-        subAz = sunAz[labImin:labImax, labJmin:labJmax]  # [loc]
-        # subAz = sunAz[loc]
-
-        subWhe = np.nonzero(subMsk)
-        ridgIdx = subOrient[subWhe[0], subWhe[1]] == 1
-
-        ridgeI = subWhe[0][ridgIdx]
-        ridgeJ = subWhe[1][ridgIdx]
-
-        # boundary of the polygon that receives cast shadow
-        cast = subOrient == -1
-
-        m, n = subMsk.shape
-        print("For shadowpolygon #%s: Its size is %s by %s," +
-              " connecting %s pixels in total" % (i, m, n, len(ridgeI)))
-
-        for x in range(len(ridgeI)):  # loop through all occluders
-            sunDir = subAz[ridgeI[x]][ridgeJ[x]]  # degrees [-180 180]
-
-            # Bresenham's line algorithm
-            dI = -np.cos(
-                np.radians(subAz[ridgeI[x]][ridgeJ[x]])
-            )  # -cos # flip axis to get from world into image coords
-            dJ = -np.sin(np.radians(subAz[ridgeI[x]][ridgeJ[x]]))  # -sin #
-            brd = 3  # add aditional cast borders to the suntrace
-            if abs(sunDir) > 90:  # northern hemisphere
-                if dI > dJ:
-                    rr = np.arange(start=0, stop=ridgeI[x] + brd, step=1)
-                    cc = np.flip(np.round(rr * dJ), axis=0) + ridgeJ[x]
-                else:
-                    cc = np.arange(start=0, stop=ridgeJ[x] + brd, step=1)
-                    rr = np.flip(np.round(cc * dI), axis=0) + ridgeI[x]
-            else:  # southern hemisphere
-                if dI > dJ:
-                    rr = np.arange(start=ridgeI[x] - brd, stop=m, step=1)
-                    cc = np.round(rr * dJ) + ridgeJ[x]
-                else:
-                    cc = np.arange(start=ridgeJ[x] - brd, stop=n, step=1)
-                    rr = np.round(cc * dI) + ridgeI[x]
-                    # generate cast line in sub-image
-            rr, cc = rr.astype(np.int64), cc.astype(np.int64)
-            # inside sub-image
-            IN = (cc >= 0) & (cc <= n) & (rr >= 0) & (rr <= m)
-            if not IN.any():
-                continue
-
-            rr = rr[IN]
-            cc = cc[IN]
-
-            subCast = np.zeros((m, n), dtype=np.uint8)
-            try:
-                subCast[rr, cc] = 1
-            except IndexError:
-                continue
-
-                # find closest casted
-            castedHit = cast & subCast
-            (castedIdx) = np.where(castedHit[subWhe[0], subWhe[1]] == 1)
-            castedI = subWhe[0][castedIdx[0]]
-            castedJ = subWhe[1][castedIdx[0]]
-            del IN, castedIdx, castedHit, subCast, rr, cc, dI, dJ, sunDir
-
-            if len(castedI) > 1:
-                # do selection of the closest casted
-                dist = np.hypot(castedI - ridgeI[x], castedJ - ridgeJ[x])
-                idx = np.where(dist == np.amin(dist))
-                castedI = castedI[idx[0]]
-                castedJ = castedJ[idx[0]]
-            elif len(castedI) > 0:
-                # write out
-                shadowIdx[ridgeI[x] + labImin][ridgeJ[x] + labJmin] = +(x + 1)
-                shadowIdx[castedI[0] + labImin][castedJ[0] +
-                                                labJmin] = -(x + 1)
+    # bounding boxes of all polygons, through a single pass over the image
+    locs = ndimage.find_objects(labeling)
+    labs = [i for i, loc in enumerate(locs, start=1) if loc is not None]
+
+    def _trace_label(i):
+        return _occluder_and_casted_of_label(labeling, bndOrient, sunAz,
+                                             locs[i - 1], i)
+
+    # the polygons are independent, hence these are traced in parallel,
+    # though written out in order, as bounding boxes can overlap
+    if (os.cpu_count() or 1) > 1 and len(labs) > 1:
+        with ThreadPoolExecutor() as executor:
+            traces = list(executor.map(_trace_label, labs))
+    else:
+        traces = map(_trace_label, labs)
 
+    for i, (m, n, k, ridgeI, ridgeJ, castI, castJ, x) in zip(labs, traces):
+        print(("For shadowpolygon #%s: Its size is %s by %s," +
+               " connecting %s pixels in total") % (i, m, n, k))
+        shadowIdx[ridgeI, ridgeJ] = +(x + 1)
+        shadowIdx[castI, castJ] = -(x + 1)
         print("polygon done")
     return shadowIdx
 
 
+def _occluder_and_casted_of_label(labeling, bndOrient, sunAz, loc, i):
+    labImin, labJmin = loc[0].start, loc[1].start
+    subMsk = labeling[loc] == i
+
+    subOrient = np.sign(bndOrient[loc])
+
+    subBound = subMsk ^ _binary_erosion(subMsk)
+    subOrient[~subBound] = 0  # remove other boundaries
+
+    subAz = sunAz[loc]
+
+    subWhe = np.nonzero(subMsk)
+    ridgIdx = subOrient[subWhe[0], subWhe[1]] == 1
+
+    ridgeI = subWhe[0][ridgIdx]
+    ridgeJ = subWhe[1][ridgIdx]
+
+    # boundary of the polygon that receives cast shadow
+    cast = subOrient == -1
+    m, n = subMsk.shape
+
+    # direction of the cast shadow, in image coordinates
+    sunDir = np.radians(subAz[ridgeI, ridgeJ])  # [-180 180]
+    ray_len = m + n  # a suntrace of this length always leaves the box
+    endI = np.round(ridgeI + ray_len * np.cos(sunDir)).astype(int)
+    endJ = np.round(ridgeJ - ray_len * np.sin(sunDir)).astype(int)
+
+    hits, castI, castJ = [], [], []
+    for x in range(len(ridgeI)):  # loop through all occluders
+        rr, cc = draw.line(ridgeI[x], ridgeJ[x], endI[x], endJ[x])
+        # inside sub-image
+        IN = (rr >= 0) & (rr < m) & (cc >= 0) & (cc < n)
+        rr, cc = rr[IN], cc[IN]
+
+        # the line starts at the occluder, so the first hit is closest
+        castedHit = cast[rr, cc]
+        if not np.any(castedHit):
+            continue
+        idx = np.argmax(castedHit)
+        hits.append(x)
+        castI.append(rr[idx])
+        castJ.append(cc[idx])
+
+    hits = np.array(hits, dtype=int)
+    return (m, n, len(ridgeI), ridgeI[hits] + labImin,
+            ridgeJ[hits] + labJmin, np.array(castI, dtype=int) + labImin,
+            np.array(castJ, dtype=int) + labJmin, hits)
+
+
 def list_occluder_and_casted(labels, sunZn, sunAz, geoTransform):
     """ Find along the edge, the casting and casted pixels of a polygon
 
@@ -646,38 +640,84 @@ def list_occluder_and_casted(labels, sunZn, sunAz, geoTransform):
     """
     msk = labels > 1
     labels = labels.astype(np.int32)
-    mskOrient = cast_orientation(msk.astype(np.float), sunAz)
+    mskOrient = cast_orientation(msk.astype(float), sunAz)
     mskOrient = np.sign(mskOrient)
 
+    # bounding boxes of all polygons, through a single pass over the image
+    locs = ndimage.find_objects(labels)
+
     castList = []
     for shp, val in shapes(labels, mask=msk, connectivity=8):
         if val == 0:
             continue
+        loc = locs[int(val) - 1]
 
         # get ridge coordinates
         polygoon = shape(shp)
-        polyRast = labels == val  # select the polygon
-        polyInnr = ndimage.binary_erosion(polyRast, np.ones((3, 3),
-                                                            dtype=bool))
+        if not polygoon.is_valid:
+            # somehow the exterior of the polygon crosses or touches
+            # itself, making it a LinearRing
+            polygoon = polygoon.buffer(0)
+        polyRast = labels[loc] == val  # select the polygon
+        polyInnr = _binary_erosion(polyRast, connectivity=2)
         polyBoun = np.logical_xor(polyRast, polyInnr)
         polyWhe = np.nonzero(polyBoun)
-        ridgIdx = mskOrient[polyWhe[0], polyWhe[1]] == 1
-        ridgeI = polyWhe[0][ridgIdx]
-        ridgeJ = polyWhe[1][ridgIdx]
+        ridgIdx = mskOrient[loc][polyWhe[0], polyWhe[1]] == 1
+        ridgeI = polyWhe[0][ridgIdx] + loc[0].start
+        ridgeJ = polyWhe[1][ridgIdx] + loc[1].start
         del polyRast, polyInnr, polyBoun, polyWhe, ridgIdx
 
-        for idx, _ in enumerate(ridgeI):  # ridgeI:
-            castLine = find_polygon_intersect(ridgeI[idx], ridgeJ[idx],
-                                              polygoon,
-                                              sunAz[ridgeI[idx]][ridgeJ[idx]],
-                                              sunZn[ridgeI[idx]][ridgeJ[idx]],
-                                              geoTransform)
-            if castLine is not None:
-                castList.append(castLine)
-            del castLine
+        # direction of the cast shadow, for all ridge pixels at once
+        ridge_az, ridge_zn = sunAz[ridgeI, ridgeJ], sunZn[ridgeI, ridgeJ]
+        d_i = np.cos(np.radians(ridge_az))
+        d_j = -np.sin(np.radians(ridge_az))
+
+        hits, casts = [], []
+        for idx in range(ridgeI.size):
+            casted = _closest_intersection(ridgeI[idx], ridgeJ[idx],
+                                           polygoon, d_i[idx], d_j[idx])
+            if casted is not None:
+                hits.append(idx)
+                casts.append(casted)
+        if not hits:
+            continue
+
+        # transform to UTM, for all pairs of the polygon at once
+        casts = np.stack(casts)
+        ridge_x, ridge_y = pix2map(geoTransform, ridgeI[hits], ridgeJ[hits])
+        cast_x, cast_y = pix2map(geoTransform, casts[:, 1], casts[:, 0])
+        castList += list(np.stack((ridge_x, ridge_y, cast_x, cast_y,
+                                   ridge_az[hits], ridge_zn[hits]), axis=1))
     return castList
 
 
+def _closest_intersection(ridge_i, ridge_j, polygoon, d_i, d_j):
+    castLine = LineString([[ridge_j, ridge_i],
+                           [ridge_j + d_j * 1e4, ridge_i + d_i * 1e4]])
+    castEnd = polygoon.intersection(castLine)
+
+    if castEnd.geom_type == 'LineString':
+        castEnd = castEnd.coords[:]
+    elif castEnd.geom_type in ('MultiLineString', 'GeometryCollection'):
+        cEnd = []
+        for m in castEnd.geoms:
+            cEnd += m.coords[:]
+        castEnd = cEnd
+    elif castEnd.geom_type == 'Point':
+        castEnd = []
+    else:
+        print('something went wrong?')
+
+    if len(castEnd) <= 1:
+        return
+
+    # find closest intersection
+    castEnd = np.asarray(castEnd)
+    dists = np.hypot(castEnd[:, 0] - ridge_j, castEnd[:, 1] - ridge_i)
+    dists[dists == 0] = np.inf
+    return castEnd[np.argmin(dists)]
+
+
 def find_polygon_intersect(ridge_i, ridge_j, polygoon, sun_az, sun_zn,
                            geoTransform):
     """
@@ -702,52 +742,16 @@ def find_polygon_intersect(ridge_i, ridge_j, polygoon, sun_az, sun_zn,
     castLine : np.array, size=(,6)
         edge locations of caster and casted, together with the sun angles
     """
-    try:
-        castLine = LineString(
-            [[ridge_j, ridge_i],
-             [
-                 ridge_j - (np.sin(np.radians(sun_az)) * 1e4),
-                 ridge_i + (np.cos(np.radians(sun_az)) * 1e4)
-             ]])
-    except IndexError:
-        return
-    try:
-        castEnd = polygoon.intersection(castLine)
-    except TopologicalError:
+    if not polygoon.is_valid:
         # somehow the exterior of the polygon crosses or touches
         # itself, making it a LinearRing
         polygoon = polygoon.buffer(0)
-        castEnd = polygoon.intersection(castLine)
-
-    if castEnd.geom_type == 'LineString':
-        castEnd = castEnd.coords[:]
-    elif castEnd.geom_type == 'MultiLineString':
-        cEnd = []
-        for m in list(castEnd):
-            cEnd += m.coords[:]
-        castEnd = cEnd
-        del m, cEnd
-    elif castEnd.geom_type == 'GeometryCollection':
-        cEnd = []
-        for m in range(len(castEnd)):
-            cEnd += castEnd[m].coords[:]
-        castEnd = cEnd
-        del m, cEnd
-    elif castEnd.geom_type == 'Point':
-        castEnd = []
-    else:
-        print('something went wrong?')
 
-    if len(castEnd) <= 1:
+    d_i, d_j = np.cos(np.radians(sun_az)), -np.sin(np.radians(sun_az))
+    casted = _closest_intersection(ridge_i, ridge_j, polygoon, d_i, d_j)
+    if casted is None:
         return
 
-    # find closest intersection
-    occluder = Point(ridge_j, ridge_i)
-    dists = [Point(c).distance(occluder) for c in castEnd]
-    dists = [float('Inf') if i == 0 else i for i in dists]
-    castIdx = dists.index(min(dists))
-    casted = castEnd[castIdx]
-
     # transform to UTM and append to array
     ridge_x, ridge_y = pix2map(geoTransform, ridge_i, ridge_j)
     cast_x, cast_y = pix2map(geoTransform, casted[1], casted[0])
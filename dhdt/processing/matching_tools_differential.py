@@ -1,7 +1,7 @@
 import warnings
 
 import numpy as np
-from scipy import interpolate, ndimage
+from scipy import ndimage
 
 from ..generic.filtering_statistical import make_2D_Gaussian
 from ..generic.handler_im import (get_grad_filters, nan_resistant_conv2,
@@ -12,6 +12,16 @@ from ..preprocessing.image_transforms import (histogram_equalization,
 from ..processing.matching_tools import get_peak_indices
 
 
+def _gaussian_smoothing(Z):
+    """ smooth with the 3x3 kernel of make_2D_Gaussian, this kernel is
+    separable, hence it is applied through two one-dimensional passes
+    """
+    g = make_2D_Gaussian((3, 3), fwhm=3)[1]  # its center row
+    Z = ndimage.convolve1d(Z, g, axis=0,
+                           output=np.result_type(Z.dtype, np.float32))
+    return ndimage.convolve1d(Z, g, axis=1)
+
+
 # spatial sub-pixel allignment functions
 def create_differential_data(I1, I2):
     """ estimate the spatial and temporal first derivatives of two arrays
@@ -63,6 +73,16 @@ def create_differential_data(I1, I2):
     di, dj = np.flipud(kernel_y), kernel_x
 
     # estimation
+    if not (np.any(np.isnan(I1)) or np.any(np.isnan(I2))):
+        I1, I2 = _gaussian_smoothing(I1), _gaussian_smoothing(I2)
+        # the filters are linear, hence the images can be combined before
+        # the derivatives are taken
+        I_12 = I1 + I2
+        I_di = ndimage.convolve(I_12, di) / 4
+        I_dj = ndimage.convolve(I_12, dj) / 4
+        I_dt = ndimage.convolve(I2 - I1, kernel_t)
+        return I_di, I_dj, I_dt
+
     if np.any(np.isnan(I1)):
         I1 = nan_resistant_conv2(I1, kernel_g, cval=0)
         I_di = nan_resistant_diff2(I1, di, cval=0) / 2
@@ -93,6 +113,42 @@ def create_differential_data(I1, I2):
     return I_di, I_dj, I_dt
 
 
+def _block_derivatives(I1, I2):
+    """ spatial and temporal derivatives over blocks of 2x2 pixels, as the
+    convolution with the kernels of [LK81]_, where the sums and differences
+    along the rows are shared by all derivatives
+    """
+    # padding, so the border is treated as with the 'reflect' mode of ndimage
+    P = np.pad(I1, ((0, 1), (0, 1)), mode='symmetric')
+    h_sum, h_dif = P[:, :-1] + P[:, 1:], P[:, :-1] - P[:, 1:]
+    fx = (h_dif[:-1] + h_dif[1:]) / 4
+    fy = (h_sum[1:] - h_sum[:-1]) / 4
+
+    P = np.pad(I2 - I1, ((0, 1), (0, 1)), mode='symmetric')
+    h_sum = P[:, :-1] + P[:, 1:]
+    ft = (h_sum[:-1] + h_sum[1:]) / 4
+    return fx, fy, ft
+
+
+def _window_bounds(sampleI, sampleJ, radius, shape):
+    i_min = np.clip(sampleI - radius, 0, shape[0])
+    i_max = np.clip(sampleI + radius + 1, 0, shape[0])
+    j_min = np.clip(sampleJ - radius, 0, shape[1])
+    j_max = np.clip(sampleJ + radius + 1, 0, shape[1])
+    return i_min, i_max, j_min, j_max
+
+
+def _window_sums(Z, i_min, i_max, j_min, j_max):
+    """ sum the intensities within the windows, via an integral image, thus
+    each window sum only needs four look-ups
+    """
+    C = np.zeros((Z.shape[0] + 1, Z.shape[1] + 1), dtype=np.float64)
+    np.cumsum(Z, axis=0, out=C[1:, 1:])
+    np.cumsum(C[1:, 1:], axis=1, out=C[1:, 1:])
+    return C[i_max, j_max] - C[i_min, j_max] - C[i_max, j_min] + \
+        C[i_min, j_min]
+
+
 def simple_optical_flow(I1,
                         I2,
                         window_size,
@@ -124,9 +180,9 @@ def simple_optical_flow(I1,
     Vgrd : numpy.ndarray, size=(k,l)
         vertical displacement estimate, in "ij"-coordinate system
     Ueig : numpy.ndarray, size=(k,l)
-        eigenvalue of system of equation for vertical estimate
+        largest eigenvalue of the system of equations
     Veig : numpy.ndarray, size=(k,l)
-        eigenvalue of system of equation for horizontal estimate
+        smallest eigenvalue of the system of equations
 
     See Also
     --------
@@ -171,9 +227,9 @@ def simple_optical_flow(I1,
         sampleJ = np.array([sampleJ])
 
     # if data range is bigger than 1, transform
-    if np.ptp(I1.flatten()) > 1:
+    if np.ptp(I1) > 1:
         I1 = mat_to_gray(I1)
-    if np.ptp(I1.flatten()) > 1:
+    if np.ptp(I2) > 1:
         I2 = mat_to_gray(I2)
 
     # smooth the image, so derivatives are not so steep
@@ -181,56 +237,53 @@ def simple_optical_flow(I1,
         I1 = ndimage.gaussian_filter(I1, sigma=sigma)
         I2 = ndimage.gaussian_filter(I2, sigma=sigma)
 
-    kernel_x = np.array([[-1., 1.], [-1., 1.]]) * .25
-    kernel_y = np.array([[1., 1.], [-1., -1.]]) * .25
-    kernel_t = np.array([[1., 1.], [1., 1.]]) * .25
+    fx, fy, ft = _block_derivatives(I1, I2)
 
-    fx = ndimage.convolve(I1, kernel_x)
-    fy = ndimage.convolve(I1, kernel_y)
-    ft = ndimage.convolve(I2, kernel_t) + ndimage.convolve(I1, -kernel_t)
+    # window_size should be odd
+    radius = np.floor(window_size / 2).astype('int')
+    win = _window_bounds(sampleI, sampleJ, radius, fx.shape)
+
+    # entries of the normal equations, through window sums
+    s_xx, s_yy = _window_sums(fx * fx, *win), _window_sums(fy * fy, *win)
+    s_xy = _window_sums(fx * fy, *win)
+    s_xt, s_yt = _window_sums(fx * ft, *win), _window_sums(fy * ft, *win)
+    s_t, s_tt = _window_sums(ft, *win), _window_sums(ft * ft, *win)
+    n_w = (win[1] - win[0]) * (win[3] - win[2])
+
+    # look if variation is present
+    var_t = s_tt * n_w - s_t**2
+    IN = var_t > np.finfo(float).eps * s_tt * n_w
+
+    # caluclate eigenvalues to see directional contrast distribution, these
+    # have a closed form for a symmetric 2x2 matrix
+    tr_half, dif_half = (s_xx + s_yy) / 2, (s_xx - s_yy) / 2
+    disc = np.hypot(dif_half, s_xy)
+    ɛ_1, ɛ_2 = tr_half + disc, tr_half - disc
+
+    # solve the 2x2 system analytically, get velocity here, but only for well
+    # conditioned systems, as the window sums carry round-off of the integral
+    # images, thus an edge (aperture problem) does not give an exact zero
+    rcond = np.sqrt(np.finfo(float).eps)
+    det = s_xx * s_yy - s_xy**2
+    nu_x, nu_y = np.zeros_like(det), np.zeros_like(det)
+    OK = np.logical_and(IN, ɛ_2 > rcond * ɛ_1)
+    nu_x[OK] = (s_xy[OK] * s_yt[OK] - s_yy[OK] * s_xt[OK]) / det[OK]
+    nu_y[OK] = (s_xy[OK] * s_xt[OK] - s_xx[OK] * s_yt[OK]) / det[OK]
+    # rank deficient systems get the minimum norm solution
+    SING = np.logical_and(IN, ~OK)
+    if np.any(SING):
+        ATA = np.stack((np.stack((s_xx[SING], s_xy[SING]), axis=-1),
+                        np.stack((s_xy[SING], s_yy[SING]), axis=-1)), axis=-2)
+        nu = np.linalg.pinv(ATA, rcond=rcond) @ \
+            -np.stack((s_xt[SING], s_yt[SING]), axis=-1)[..., np.newaxis]
+        nu_x[SING], nu_y[SING] = nu[:, 0, 0], nu[:, 1, 0]
+    ɛ_1[~IN], ɛ_2[~IN] = 0, 0
 
     # grid or single estimation
     if sampleI.ndim > 1:
-        assert sampleI.shape == sampleJ.shape
-        Ugrd = np.zeros_like(sampleI, dtype="float")
-        Vgrd = np.zeros_like(sampleI, dtype="float")
-        Ueig, Veig = np.zeros_like(Ugrd), np.zeros_like(Ugrd)
+        Ugrd, Vgrd, Ueig, Veig = nu_x, nu_y, ɛ_1, ɛ_2
     else:
-        Ugrd, Vgrd, Ueig, Veig = 0, 0, 0, 0
-
-    # window_size should be odd
-    radius = np.floor(window_size / 2).astype('int')
-    for iIdx in np.arange(sampleI.size):
-        iIm = sampleI.flat[iIdx]
-        jIm = sampleJ.flat[iIdx]
-
-        if sampleI.ndim > 1:
-            (iGrd, jGrd) = np.unravel_index(iIdx, sampleI.shape)
-
-        # get templates
-        Ix = fx[iIm - radius:iIm + radius + 1,
-                jIm - radius:jIm + radius + 1].flatten()  # noqa: E501
-        Iy = fy[iIm - radius:iIm + radius + 1,
-                jIm - radius:jIm + radius + 1].flatten()  # noqa: E501
-        It = ft[iIm - radius:iIm + radius + 1,
-                jIm - radius:jIm + radius + 1].flatten()  # noqa: E501
-
-        # look if variation is present
-        if np.std(It) != 0:
-            b = It  # get b here
-            A = np.stack((Ix, Iy), axis=1)  # get A here
-
-            # caluclate eigenvalues to see directional contrast distribution
-            ɛ = np.linalg.eigvals(np.matmul(A.T, A))
-            nu = np.matmul(np.linalg.pinv(A), -b)  # get velocity here
-
-            if sampleI.ndim > 1:
-                Ugrd[iGrd, jGrd], Vgrd[iGrd, jGrd] = nu[0][0], nu[1][0]
-                Ueig[iGrd, jGrd], Veig[iGrd, jGrd] = ɛ[0], ɛ[1]
-            else:
-                Ugrd, Vgrd = nu[1][0], nu[0][0]
-                Ueig, Veig = ɛ[1], ɛ[0]
-
+        Ugrd, Vgrd, Ueig, Veig = nu_y[-1], nu_x[-1], ɛ_1[-1], ɛ_2[-1]
     return Ugrd, Vgrd, Ueig, Veig
 
 
@@ -329,7 +382,7 @@ def affine_optical_flow(I1,
     if preprocessing in ['hist_equal']:
         I1 = histogram_equalization(I1, I2)
     # smooth to not have very sharp derivatives
-    I1 = ndimage.convolve(I1, make_2D_Gaussian((3, 3), fwhm=3))
+    I1 = _gaussian_smoothing(I1)
 
     # calculate spatial and temporal derivatives
     I_di, I_dj = ndimage.convolve(I1, kernel_i), ndimage.convolve(I1, kernel_j)
@@ -343,7 +396,20 @@ def affine_optical_flow(I1,
     (grd_i, grd_j) = np.meshgrid(np.linspace(-(mI - 1) / 2, +(mI - 1) / 2, mI),
                                  np.linspace(-(nI - 1) / 2, +(nI - 1) / 2, nI),
                                  indexing='ij')
-    stk_ij = np.column_stack([grd_i.flatten(), grd_j.flatten()])
+    stk_ij = np.column_stack([grd_i.ravel(), grd_j.ravel()])
+
+    if model in ('affine', 'similarity'):
+        # the Jacobian only depends upon the first image, hence it is
+        # composed once, from flattened views of the arrays
+        grd_i, grd_j, W = grd_i.ravel(), grd_j.ravel(), W.ravel()
+        I_di, I_dj = I_di.ravel(), I_dj.ravel()
+        if model in ('affine'):
+            dWdp = np.empty((6, mnI))
+            np.multiply(I_di, grd_i, out=dWdp[0])
+            np.multiply(I_dj, grd_i, out=dWdp[1])
+            np.multiply(I_di, grd_j, out=dWdp[2])
+            np.multiply(I_dj, grd_j, out=dWdp[3])
+            dWdp[4], dWdp[5] = I_di, I_dj
 
     # initialize iteration
     p = np.zeros((1, 6), dtype=float)
@@ -356,32 +422,29 @@ def affine_optical_flow(I1,
         new_j = np.reshape(grd_new[1, :], (mI, nI))
 
         # quit when outside the domain
-        if np.any(0 >= new_i > mI) or np.any(0 >= new_j > nI):
+        if np.any(np.abs(new_i) > mI / 2) or np.any(np.abs(new_j) > nI / 2):
             break
 
-        I2_new = interpolate.griddata(stk_ij,
-                                      I2.flatten().T, (new_i, new_j),
-                                      method='cubic')
-        I2_new = ndimage.convolve(I2_new, make_2D_Gaussian((3, 3), fwhm=3))
+        # the grid is regular, hence spline interpolation can be used, where
+        # the local coordinates are shifted towards the image frame
+        I2_new = ndimage.map_coordinates(
+            I2, [new_i + (mI - 1) / 2, new_j + (nI - 1) / 2],
+            order=3,
+            mode='constant',
+            cval=np.nan)
+        I2_new = _gaussian_smoothing(I2_new)
 
         I_dt_new = I2_new - I1
 
         # compose Jacobian and Hessian
-        grd_i, grd_j = grd_i.flatten(), grd_j.flatten()
         if model in ('affine', 'similarity'):
-            I_dt_new, W = I_dt_new.flatten(), W.flatten()
+            I_dt_new = I_dt_new.ravel()
             IN = ~np.isnan(I_dt_new)
-            I_di, I_dj = I_di.flatten(), I_dj.flatten()
 
             if model in ('affine'):
-                dWdp = np.array([
-                    I_di * grd_i, I_dj * grd_i, I_di * grd_j, I_dj * grd_j,
-                    I_di, I_dj
-                ])
-
-                A = (np.tile(W[IN], (6, 1)) * dWdp[:, IN]) @ dWdp[:, IN].T
-                y = (np.tile(W[IN],
-                             (6, 1)) * dWdp[:, IN]) @ (I_dt_new[IN] * W[IN])
+                W_dWdp = W[IN] * dWdp[:, IN]
+                A = W_dWdp @ dWdp[:, IN].T
+                y = W_dWdp @ (I_dt_new[IN] * W[IN])
             elif model in ():
                 dWdp = np.array([(I_di * grd_i) - (I_di * grd_j),
                                  (I_dj * grd_i) + (I_dj * grd_j), I_di, I_dj])
@@ -434,6 +497,13 @@ def affine_optical_flow(I1,
     return -2 * u, -2 * v, A, snr
 
 
+def _fill_no_data(Z):
+    # masked arrays are slow in arithmetic, hence no-data is given by NaN's
+    if isinstance(Z, np.ma.core.MaskedArray):
+        return Z.astype(float).filled(np.nan)
+    return Z.astype(float)
+
+
 def hough_optical_flow(I1,
                        I2,
                        param_resol=100,
@@ -489,53 +559,74 @@ def hough_optical_flow(I1,
     assert I2.ndim == 2, ("only grayscale imagery are implemented")
     are_two_arrays_equal(I1, I2)
 
-    # resolve no-data or masked array
-    Msk_1, Msk_2 = np.isnan(I1), np.isnan(I2)
-    if isinstance(I1, np.ma.core.MaskedArray):
-        Msk_1 = np.logical_or(Msk_1, np.ma.getmaskarray(I1))
-    if isinstance(I1, np.ma.core.MaskedArray):
-        Msk_1 = np.logical_or(Msk_2, np.ma.getmaskarray(I2))
-    I1[Msk_1], I2[Msk_2] = np.nan, np.nan
+    # resolve no-data or masked array, into plain arrays with NaN's
+    I1, I2 = _fill_no_data(I1), _fill_no_data(I2)
+    Msk = np.logical_or(np.isnan(I1), np.isnan(I2))
 
     if preprocessing in ['hist_equal']:
         I1 = histogram_equalization(I1, I2)
 
     I_di, I_dj, I_dt = create_differential_data(I1, I2)
 
+    # remove flat contrast data or data with NaN's, and only create the data
+    # at the remaining pixels, via their flat indices
+    idx = np.flatnonzero(np.logical_and(np.logical_or(I_di != 0, I_dj != 0),
+                                        ~Msk))
+    I_di, I_dj, I_dt = I_di.ravel()[idx], I_dj.ravel()[idx], I_dt.ravel()[idx]
+
     # create data
     abs_G = np.hypot(I_di, I_dj)
     θ_G = np.arctan2(I_dj, I_di)
 
     ρ = np.divide(I_dt, abs_G, out=np.zeros_like(abs_G), where=abs_G != 0)
 
-    # remove flat contrast data or data with NaN's
-    IN = np.logical_and(~np.logical_and(I_di == 0, I_dj == 0),
-                        np.logical_or(Msk_1, Msk_2))
-
-    di, dj, score = hough_sinus(θ_G[IN],
-                                ρ[IN],
+    di, dj, score = hough_sinus(θ_G,
+                                ρ,
                                 param_resol=param_resol,
                                 max_amp=max_amp,
                                 sample_fraction=sample_fraction,
                                 num_estimates=num_estimates,
                                 indexing='cartesian')
     # import matplotlib.pyplot as plt
-    # plt.hexbin(θ_G[IN], ρ[IN], extent=(-3.14, +3.14, -1, +1)), plt.show()
+    # plt.hexbin(θ_G, ρ, extent=(-3.14, +3.14, -1, +1)), plt.show()
     return di, dj, score
 
 
-def _point_sample(φ, ρ, idx, param_resol, max_amp, u, v):
-    democracy = np.zeros((param_resol, param_resol), dtype=np.float32)
-    for counter in idx:
-        diff = ρ[counter] - \
-               (u * +np.sin(φ[counter]) +
-                v * +np.cos(φ[counter]))
+def _sinus_votes(φ, ρ, weights, param_resol, max_amp, u, v, block=2**17):
+    """ accumulate the votes of all samples in the Hough space, this is done
+    in single precision and over blocks of samples, where the weighted sum of
+    a block is a single matrix-vector product
+    """
+    # absorb the scaling of the Gaussian weighting into the parameter space
+    scale = -param_resol / max_amp
+    u_s = (u * scale).astype(np.float32).ravel()
+    v_s = (v * scale).astype(np.float32).ravel()
+    ρ_s = (ρ * scale).astype(np.float32)
+    sin_φ, cos_φ = np.sin(φ).astype(np.float32), np.cos(φ).astype(np.float32)
+    weights = np.asarray(weights, dtype=np.float32)
+
+    IN = ~np.isnan(ρ_s)
+    if not np.all(IN):
+        ρ_s, sin_φ, cos_φ, weights = ρ_s[IN], sin_φ[IN], cos_φ[IN], weights[IN]
+
+    democracy = np.zeros(u_s.size, dtype=np.float32)
+    step = max(1, block // u_s.size)  # samples per block
+    for b in range(0, ρ_s.size, step):
+        s = slice(b, b + step)
+        vote = np.multiply.outer(sin_φ[s], u_s)
+        vote += np.multiply.outer(cos_φ[s], v_s)
+        np.subtract(ρ_s[s, np.newaxis], vote, out=vote)
         # Gaussian weighting
-        vote = np.exp(-np.abs(diff * param_resol) / max_amp)
-        # todo: outer product, to speed-up
-        np.putmask(vote, np.isnan(vote), 0)
-        democracy += vote
-    return democracy
+        np.abs(vote, out=vote)
+        np.negative(vote, out=vote)
+        np.exp(vote, out=vote)
+        democracy += weights[s] @ vote
+    return democracy.reshape(u.shape)
+
+
+def _point_sample(φ, ρ, idx, param_resol, max_amp, u, v):
+    return _sinus_votes(φ[idx], ρ[idx], np.ones(len(idx)), param_resol,
+                        max_amp, u, v)
 
 
 def _histogram_sample(φ, ρ, param_resol, max_amp, u, v):
@@ -544,15 +635,9 @@ def _histogram_sample(φ, ρ, param_resol, max_amp, u, v):
                                  bins=param_resol,
                                  range=[[-180, +180], [-max_amp, +max_amp]])
 
-    democracy = np.zeros((param_resol, param_resol), dtype=np.float32)
-    for i, j in np.ndindex(H.shape):
-        if H[i, j] == 0:
-            continue
-        diff = ρ_h[j] - (u * +np.sin(φ_h[i]) + v * +np.cos(φ_h[i]))
-        vote = np.exp(-np.abs(diff * param_resol) / max_amp)
-        np.putmask(vote, np.isnan(vote), 0)
-        democracy += H[i, j] * vote
-    return democracy
+    # only the occupied bins of the histogram cast a vote
+    i, j = np.nonzero(H)
+    return _sinus_votes(φ_h[i], ρ_h[j], H[i, j], param_resol, max_amp, u, v)
 
 
 def hough_sinus(φ,
@@ -171,7 +171,7 @@ def cosine_corr(I1, I2):
     for i in range(bands):  # loop through all bands
         Q_b = _cosine_corr_core(I1sub[..., i], I2sub[..., i])
         if i == 0:
-            Q = Q_b.copy() / bands
+            Q = Q_b / bands
         else:
             Q += Q_b / bands
     return Q
@@ -356,7 +356,7 @@ def phase_only_corr(I1, I2):
     for i in range(bands):  # loop through all bands
         Q_b = _phase_only_corr_core(I1sub[:, :, i], I2sub[:, :, i])
         if i == 0:
-            Q = Q_b.copy() / bands
+            Q = Q_b / bands
         else:
             Q += Q_b / bands
     return Q
@@ -613,7 +613,7 @@ def symmetric_phase_corr(I1, I2):
     for i in range(bands):  # loop through all bands
         Q_b = _symmetric_phase_corr_core(I1sub[..., i], I2sub[..., i])
         if i == 0:
-            Q = Q_b.copy() / bands
+            Q = Q_b / bands
         else:
             Q += Q_b / bands
     return Q
@@ -682,7 +682,7 @@ def amplitude_comp_corr(I1, I2, F_0=0.04):
     for i in range(bands):  # loop through all bands
         Q_b = _amplitude_comp_corr_core(I1sub[..., i], I2sub[..., i], F_0)
         if i == 0:
-            Q = Q_b.copy() / bands
+            Q = Q_b / bands
         else:
             Q += Q_b / bands
     return Q
@@ -848,7 +848,7 @@ def gradient_corr(I1, I2):
     for i in range(bands):  # loop through all bands
         Q_b = _gradient_corr_core(I1sub[..., i], I2sub[..., i], H_x, H_y)
         if i == 0:
-            Q = Q_b.copy() / bands
+            Q = Q_b / bands
         else:
             Q += Q_b / bands
     return Q
@@ -963,7 +963,7 @@ def normalized_gradient_corr(I1, I2):
         Q_b = _normalized_gradient_corr_core(I1sub[..., i], I2sub[..., i], H_x,
                                              H_y)
         if i == 0:
-            Q = Q_b.copy() / bands
+            Q = Q_b / bands
         else:
             Q += Q_b / bands
     return Q
@@ -1080,7 +1080,7 @@ def orientation_corr(I1, I2):
     for i in range(bands):  # loop through all bands
         Q_b = _orientation_corr_core(I1sub[..., i], I2sub[..., i], H_x, H_y)
         if i == 0:
-            Q = Q_b.copy() / bands
+            Q = Q_b / bands
         else:
             Q += Q_b / bands
     return Q
@@ -1163,7 +1163,7 @@ def windrose_corr(I1, I2):
     for i in range(bands):  # loop through all bands
         Q_b = _windrose_corr_core(I1sub[..., i], I2sub[..., i])
         if i == 0:
-            Q = Q_b.copy() / bands
+            Q = Q_b / bands
         else:
             Q += Q_b / bands
     return Q
@@ -1259,7 +1259,7 @@ def phase_corr(I1, I2):
     for i in range(bands):  # loop through all bands
         Q_b = _phase_corr_core(I1sub[..., i], I2sub[..., i])
         if i == 0:
-            Q = Q_b.copy() / bands
+            Q = Q_b / bands
         else:
             Q += Q_b / bands
     return Q
@@ -1356,7 +1356,7 @@ def gaussian_transformed_phase_corr(I1, I2):
         Q_b = _gaussian_transformed_phase_corr_core(I1sub[..., i], I2sub[...,
                                                                          i])
         if i == 0:
-            Q = Q_b.copy() / bands
+            Q = Q_b / bands
         else:
             Q += Q_b / bands
     return Q
@@ -1525,7 +1525,7 @@ def cross_corr(I1, I2):
     for i in range(bands):  # loop through all bands
         Q_b = _cross_corr_core(I1sub[..., i], I2sub[..., i])
         if i == 0:
-            Q = Q_b.copy() / bands
+            Q = Q_b / bands
         else:
             Q += Q_b / bands
     return Q
@@ -1608,7 +1608,7 @@ def binary_orientation_corr(I1, I2):
     for i in range(bands):  # loop through all bands
         Q_b = _binary_orientation_corr_core(I1sub[..., i], I2sub[..., i])
         if i == 0:
-            Q = Q_b.copy() / bands
+            Q = Q_b / bands
         else:
             Q += Q_b / bands
     return Q
@@ -869,26 +869,28 @@ def cross_shading_filter(Q, az_1, az_2):  # todo
     θ = np.angle(F_2 + 1j * F_1)
     az_1, az_2 = np.deg2rad(az_1), np.deg2rad(az_2)
 
-    def _get_angular_sel(θ, az_1, az_2):
-        c_θ, s_θ = np.cos(θ), np.sin(θ)
+    c_θ, s_θ = np.cos(θ), np.sin(θ)
+
+    def _get_angular_sel(c_θ, s_θ, az_1, az_2):
         c_down = np.minimum(np.cos(az_1), np.cos(az_2))
         s_down = np.minimum(np.sin(az_1), np.sin(az_2))
         c_up = np.maximum(np.cos(az_1), np.cos(az_2))
         s_up = np.maximum(np.sin(az_1), np.sin(az_2))
-        OUT = np.logical_and(
-            np.logical_and(np.less(c_down, c_θ), np.less(c_θ, c_up)),
-            np.logical_and(np.less(s_down, s_θ),
-                           np.less(s_θ, s_up)))  # (4.42) in [1], pp.51
+        # (4.42) in [1], pp.51, combined in-place into one boolean array
+        OUT = np.less(c_down, c_θ)
+        OUT &= np.less(c_θ, c_up)
+        OUT &= np.less(s_down, s_θ)
+        OUT &= np.less(s_θ, s_up)
         return OUT
 
-    W = np.ones_like(Q, dtype=float)
     down, up = az_2 - (3 * np.pi / 2), az_1 - (np.pi / 2)
-    OUT1 = _get_angular_sel(θ, down, up)
-    np.putmask(W, OUT1, 0)
+    OUT = _get_angular_sel(c_θ, s_θ, down, up)
 
     down, up = az_2 - (np.pi / 2), az_1 + (np.pi / 2)
-    OUT2 = _get_angular_sel(θ, down, up)
-    np.putmask(W, OUT2, 0)
+    OUT |= _get_angular_sel(c_θ, s_θ, down, up)
+
+    W = np.ones_like(Q, dtype=float)
+    W[OUT] = 0
     return W
 
 
@@ -8,8 +8,8 @@ import numpy as np
 import pandas as pd
 
 from dhdt.generic.debugging import start_pipeline
-from dhdt.generic.mapping_io import read_geo_image
-from dhdt.generic.mapping_tools import map2pix, ref_trans, ref_update
+from dhdt.generic.mapping_io import read_geo_image, read_geo_info
+from dhdt.generic.mapping_tools import map2pix
 from dhdt.processing.coupling_tools import merge_by_common_caster_id_simple, \
     split_caster_id_on_orbit_id
 from dhdt.postprocessing.photohypsometric_tools import \
@@ -29,18 +29,19 @@ DUMP_DIR = os.path.join(ROOT_DIR, "glaciers")
 RGI_PATH = os.path.join(DATA_DIR, "RGI", MGRS_TILE+'.tif')
 DEM_PATH = os.path.join(DATA_DIR, "DEM", MGRS_TILE+'.tif')
 
-# import and create general assets
-rgi_dat,_,rgi_aff,_ = read_geo_image(RGI_PATH)
-dem_dat,crs,dem_aff,_ = read_geo_image(DEM_PATH)
-
-# decrease the image size to bounding box
+# import and create general assets, only reading the bounding box
+_, rgi_aff, _, rows, cols, _ = read_geo_info(RGI_PATH)
 bbox_xy = np.array(BBOX).reshape((2,2)).T.ravel()
 bbox_i, bbox_j = map2pix(rgi_aff, bbox_xy[0:2], np.flip(bbox_xy[2::]))
 bbox_i, bbox_j = np.round(bbox_i).astype(int), np.round(bbox_j).astype(int)
-new_aff = ref_trans(rgi_aff, int(bbox_i[0]), int(bbox_j[0]))
-rgi_dat = rgi_dat[bbox_i[0]:bbox_i[1],bbox_j[0]:bbox_j[1]]
-dem_dat = dem_dat[bbox_i[0]:bbox_i[1],bbox_j[0]:bbox_j[1]]
-new_aff = ref_update(new_aff, rgi_dat.shape[0], rgi_dat.shape[1])
+# a bounding box can fall partly outside the tile, while read_geo_image only
+# accepts a window within the image, hence clip to the tile extent. When the
+# bounding box is fully outside the tile, read_geo_image raises an error
+bbox_i, bbox_j = np.clip(bbox_i, 0, rows), np.clip(bbox_j, 0, cols)
+window = (bbox_i[0], bbox_i[1], bbox_j[0], bbox_j[1])
+
+rgi_dat,_,new_aff,_ = read_geo_image(RGI_PATH, window=window)
+dem_dat,crs,_,_ = read_geo_image(DEM_PATH, window=window)
 
 
 def main():
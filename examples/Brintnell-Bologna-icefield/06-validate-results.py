@@ -2,10 +2,10 @@
 Validate results via indepdent elevation model, that stems from ultra-high
 resolution photogrammetric elevation model
 """
+import argparse
 import os
 
 import numpy as np
-import matplotlib.pyplot as plt
 
 from dhdt.generic.handler_www import get_file_from_www
 from dhdt.generic.mapping_io import read_geo_image
@@ -22,7 +22,7 @@ REF_PATH = os.path.join(DATA_DIR, "PLEI", MGRS_TILE+'.tif')
 RGI_PATH = os.path.join(DATA_DIR, "RGI", MGRS_TILE+'.tif')
 DEM_PATH = os.path.join(DATA_DIR, "DEM", MGRS_TILE+'.tif')
 
-def main():
+def main(plot=False):
     # do downloading if files are not present
     if not os.path.exists(REF_PATH):
         fname = get_file_from_www(DATA_URL,
@@ -52,7 +52,13 @@ def main():
 #    Mb /= 1E3 # mwe
 #    Mb /= 5 # yr
     print('.')
-    plt.plot(np.tile(z_bin, (Mb.shape[0], 1)).T, Mb.T);
+    if plot:
+        import matplotlib.pyplot as plt
+        plt.plot(np.tile(z_bin, (Mb.shape[0], 1)).T, Mb.T)
+        plt.show()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plot', action='store_true',
+                        help='show the specific glacier hypsometries')
+    main(plot=parser.parse_args().plot)
@@ -48,6 +48,18 @@ def test_create_rgi_raster_set_up_correct_raster_file():
         assert np.all(np.unique(raster) == np.arange(11))
 
 
+def test_create_rgi_raster_in_memory_without_raster_path():
+    shapes, crs, geoTransform = _set_up_data_for_rgi_raster()
+    data = create_rgi_raster(
+        rgi_shapes=shapes,
+        geoTransform=geoTransform,
+        crs=crs,
+    )
+
+    assert data.shape == RASTER_SHAPE
+    assert np.all(np.unique(data) == np.arange(11))
+
+
 def test_create_rgi_tile_s2_requires_full_mgrs_tile_codes():
     """ Two leading characters needs to be used for the UTM zone """
     with pytest.raises(ValueError):
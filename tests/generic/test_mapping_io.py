@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+import numpy as np
+
+from dhdt.generic.mapping_io import make_geo_im, read_geo_image
+from dhdt.generic.mapping_tools import ref_trans
+from dhdt.testing.mapping_tools import create_local_crs
+
+RASTER_SHAPE = (60, 80)
+
+
+def test_read_geo_image_window_equals_slicing_full_read():
+    Z = np.random.random(RASTER_SHAPE).astype(np.float32)
+    geoTransform = (461000., 20., 0., 6624200., 0., -20.)
+    window = (10, 45, 5, 70)  # i_min, i_max, j_min, j_max
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fpath = os.path.join(tmpdir, 'tmp.tif')
+        make_geo_im(Z, geoTransform, create_local_crs(), fpath)
+
+        Z_full, _, geoTransform_full, _ = read_geo_image(fpath)
+        Z_sub, _, geoTransform_sub, _ = read_geo_image(fpath, window=window)
+
+    Z_slice = np.asarray(Z_full)[window[0]:window[1], window[2]:window[3]]
+    assert np.array_equal(np.asarray(Z_sub), Z_slice)
+    assert np.allclose(
+        geoTransform_sub,
+        ref_trans(geoTransform_full[:6], window[0], window[2]) +
+        Z_slice.shape)
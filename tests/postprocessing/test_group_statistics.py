@@ -0,0 +1,54 @@
+import numpy as np
+
+from dhdt.postprocessing.group_statistics import (get_general_hypsometry,
+                                                  get_normalized_hypsometry)
+
+
+def _create_glaciers(m=20, n=30):
+    RGI = np.zeros((m, n), dtype=int)
+    RGI[:, n // 2:] = 1
+    Z = np.tile(np.linspace(1000., 2000., m)[:, np.newaxis], (1, n))
+    Z[:, n // 2:] += 500.
+    dZ = np.random.normal(size=(m, n))
+    return RGI, Z, dZ
+
+
+def test_get_normalized_hypsometry_excludes_glaciers_without_relief(bins=5):
+    RGI, Z, dZ = _create_glaciers()
+    hyps, count = get_normalized_hypsometry(RGI, Z, dZ, bins=bins)
+
+    # add a flat, a single pixel and a glacier with no-data in its elevation
+    RGI_ext = np.hstack((RGI, np.full((RGI.shape[0], 3), 2)))
+    RGI_ext[:, -2] = 3
+    RGI_ext[0, -1], RGI_ext[1:, -1] = 4, 5
+    Z_ext = np.hstack((Z, np.tile(1500., (Z.shape[0], 3))))
+    Z_ext[:, -1] = np.linspace(1000., 2000., Z.shape[0])
+    Z_ext[5, -1] = np.nan
+    dZ_ext = np.hstack((dZ, np.full((dZ.shape[0], 3), 1000.)))
+
+    hyps_ext, count_ext = get_normalized_hypsometry(RGI_ext,
+                                                    Z_ext,
+                                                    dZ_ext,
+                                                    bins=bins)
+    assert np.array_equal(count, count_ext)
+    assert np.allclose(hyps, hyps_ext)
+
+
+def test_get_general_hypsometry_excludes_masked_data(interval=100.):
+    _, Z, dZ = _create_glaciers()
+    label, hyps, counts = get_general_hypsometry(Z.ravel(),
+                                                 dZ.ravel(),
+                                                 interval=interval)
+
+    # masked no-data, that is not a NaN, should not enter the estimates
+    Z_ext = np.ma.array(np.append(Z.ravel(), [5000., 5000.]),
+                        mask=np.append(np.zeros(Z.size, dtype=bool),
+                                       [True, False]))
+    dZ_ext = np.ma.array(np.append(dZ.ravel(), [-9999., -9999.]),
+                         mask=np.append(np.zeros(dZ.size, dtype=bool),
+                                        [False, True]))
+    label_ext, hyps_ext, counts_ext = get_general_hypsometry(
+        Z_ext, dZ_ext, interval=interval)
+    assert np.array_equal(label, label_ext)
+    assert np.array_equal(counts, counts_ext)
+    assert np.allclose(hyps, hyps_ext)
@@ -0,0 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+from scipy import ndimage
+
+from dhdt.preprocessing.shadow_filters import _filter_tiled, kuwahara_filter
+
+
+def _kuwahara_brute_force(Z, tsize):
+    r = tsize // 2
+    Z_pad = np.pad(Z, r, mode='symmetric')
+    Z_new = np.zeros_like(Z)
+    for i, j in np.ndindex(Z.shape):
+        buffer = Z_pad[i:i + tsize, j:j + tsize]
+        abcd = [
+            buffer[:r + 1, :r + 1], buffer[r:, :r + 1], buffer[:r + 1, r:],
+            buffer[r:, r:]
+        ]
+        idx = np.argmin([np.var(blk) for blk in abcd])
+        Z_new[i, j] = np.mean(abcd[idx])
+    return Z_new
+
+
+def test_kuwahara_filter(m=20, n=30):
+    Z = np.random.random((m, n))
+    for tsize in (3, 5, 7):
+        Z_new = kuwahara_filter(Z, tsize=tsize)
+        assert np.allclose(Z_new, _kuwahara_brute_force(Z, tsize))
+
+
+def test_filter_tiled(m=130, n=70, tsize=5):
+    Z = np.random.random((m, n))
+    func = partial(ndimage.median_filter, size=tsize)
+    with ThreadPoolExecutor() as executor:
+        Z_new = _filter_tiled(Z, func, tsize // 2, executor, tile=32)
+    assert np.array_equal(Z_new, func(Z))
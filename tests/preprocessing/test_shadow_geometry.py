@@ -0,0 +1,21 @@
+import numpy as np
+
+from dhdt.preprocessing.shadow_geometry import find_valley
+
+
+def test_find_valley_single_dip(neighbors=2):
+    values = np.array([5., 4., 3., 2., 1., 2., 3., 4., 5.])
+    base = np.arange(values.size, dtype=float)
+    dips, quantiles = find_valley(values, base, neighbors=neighbors)
+    assert np.array_equal(dips, np.array([4.]))
+    assert np.allclose(quantiles, np.cumsum(values)[4] / np.sum(values))
+    return
+
+
+def test_find_valley_short_input(neighbors=2):
+    for m in range(2 * neighbors + 1):
+        values = np.arange(m, 0, -1, dtype=float)
+        dips, quantiles = find_valley(values, np.arange(m, dtype=float),
+                                      neighbors=neighbors)
+        assert dips.size == 0 and quantiles.size == 0
+    return
@@ -0,0 +1,27 @@
+import numpy as np
+
+from dhdt.processing.matching_tools_differential import (_block_derivatives,
+                                                         simple_optical_flow)
+
+
+def test_simple_optical_flow_edge(ssize=(2**6, 2**6), radius=3):
+    """ a window with only a straight edge has a rank deficient system, hence
+    the minimum norm (least squares) solution should be given """
+    I_grd, J_grd = np.mgrid[:ssize[0], :ssize[1]].astype(float)
+    # intensities are kept within a unit range, so no rescaling is done
+    I1 = .5 + .25 * np.sin(.3 * (I_grd + J_grd))
+    I2 = .5 + .25 * np.sin(.3 * (I_grd + J_grd - .5))
+
+    sampleI = np.array([[20, 30], [40, 25]])
+    sampleJ = np.array([[20, 31], [35, 40]])
+    U, V, _, _ = simple_optical_flow(I1, I2, 2 * radius + 1, sampleI,
+                                     sampleJ)
+
+    fx, fy, ft = _block_derivatives(I1, I2)
+    for u, v, i, j in zip(U.flat, V.flat, sampleI.flat, sampleJ.flat):
+        win = (slice(i - radius, i + radius + 1),
+               slice(j - radius, j + radius + 1))
+        A = np.stack((fx[win].ravel(), fy[win].ravel()), axis=1)
+        nu = np.linalg.lstsq(A, -ft[win].ravel(), rcond=None)[0]
+        assert np.allclose((u, v), nu, atol=1e-6)
+    return